@@ -1,37 +1,53 @@
 import streamlit as st
 import pandas as pd
-import chardet
+import numpy as np
+from csv_loader import read_campaign_csv
+from frame_cache import FrameCache
+from demand_parsing import parse_demand_series
+from campaign_frame import parse_date_columns, encode_categoricals, category_options, enable_copy_on_write
+from campaign_index import (build_partition_index, partition_positions, partition_intervals, query_date_intervals,
+                            date_window_mask, DATE_MATCH_MODES)
+from campaign_selection import selection_editor, selection_stats, selected_frame
+from campaign_tables import paged_table
+from campaign_estimates import growth_scenarios, period_basis, uncertainty
+from session_memo import session_memo, upload_key
+from estimation import batch_estimates, combine_estimates
+
 from datetime import datetime
 
-def load_data(uploaded_file):
-    raw = uploaded_file.read()
-    encoding = chardet.detect(raw)['encoding']
-    uploaded_file.seek(0)
-    
-    # Try different separators since your file uses semicolon
-    try:
-        df = pd.read_csv(uploaded_file, encoding=encoding, sep=';', dayfirst=True)
-    except:
-        uploaded_file.seek(0)
-        df = pd.read_csv(uploaded_file, encoding=encoding, sep='\t', dayfirst=True)
-    
-    return df
+enable_copy_on_write()
+
+@st.cache_resource
+def get_frame_cache():
+    return FrameCache()
+
+def load_data(content_key, uploaded_file):
+    """Frame for an upload whose content key is already known; the bytes are only parsed on a cache miss."""
+    frame_cache = get_frame_cache()
+    df = frame_cache.get(content_key)
+    if df is not None:
+        return df
+    # encoding and separator are sniffed from the head of the file, so it is parsed only once
+    df = read_campaign_csv(uploaded_file.getvalue())
+    # dates are parsed here, before map_column_names copies them, so filter_data never re-parses
+    df = parse_date_columns(df, ['Start', 'End', 'Date Start', 'Date End'])
+    df = map_column_names(df)
+    df = encode_categoricals(df, ['Country', 'Category', 'Category_name'])
+    df = clean_demand_column(df)
+    frame_cache.put(content_key, df)
+    return df.copy(deep=False)
+
+@st.cache_resource(max_entries=4)
+def get_partition_index(content_key, _df):
+    # a shared resource rather than cache_data, so date intervals built lazily per slice persist across reruns
+    return build_partition_index(_df, category_col='Category_name')
 
 def clean_demand_column(df):
-    def parse_demand(val):
-        if pd.isna(val):
-            return None
-        val = str(val)
-        val = val.replace('€', '').replace(' ', '')
-        val = val.replace('.', '').replace(',', '.')
-        try:
-            return float(val)
-        except ValueError:
-            return None
-    
     # Map the column names from your new CSV
     if 'Demand' in df.columns:
-        df['Demand'] = df['Demand'].apply(parse_demand)
+        parsed = parse_demand_series(df['Demand'])
+        df['Demand'] = parsed
+        df.attrs['demand_format'] = parsed.attrs['number_format']._asdict()
     return df
 
 def map_column_names(df):
@@ -53,46 +69,45 @@ def map_column_names(df):
     
     return df
 
-def filter_data(df, country, campaign_filter, start_date, end_date, selected_category=None):
-    df_filtered = df[df['Country'] == country].copy()
+def filter_data_windows(df, country, campaign_filter, windows, selected_category=None, partition_index=None, date_match='contained'):
+    """Apply the country, category and name filters once, then return one slice per (start, end) window."""
+    # Handle date columns - try different possible column names
+    date_start_col = 'Date Start' if 'Date Start' in df.columns else 'Start'
+    date_end_col = 'Date End' if 'Date End' in df.columns else 'End'
 
-    if selected_category and selected_category != "All":
-        df_filtered = df_filtered[df_filtered['Category_name'].str.strip().str.lower() == selected_category.strip().lower()]
+    if partition_index is not None:
+        positions = partition_positions(partition_index, country, selected_category)
+        df_filtered = df.take(positions)
+    else:
+        df_filtered = df[df['Country'] == country]
+        if selected_category and selected_category != "All":
+            df_filtered = df_filtered[df_filtered['Category_name'].str.strip().str.lower() == selected_category.strip().lower()]
 
-    if campaign_filter and len(campaign_filter) >= 3:
+    searched = bool(campaign_filter and len(campaign_filter) >= 3)
+    if searched:
         mask_desc = df_filtered['Description'].str.contains(campaign_filter, case=False, na=False)
         # Use 'Campaign name' if available, otherwise use 'Name'
         campaign_col = 'Campaign name' if 'Campaign name' in df_filtered.columns else 'Name'
         mask_camp = df_filtered[campaign_col].str.contains(campaign_filter, case=False, na=False)
         df_filtered = df_filtered[mask_desc | mask_camp]
 
-    # Handle date columns - try different possible column names
-    date_start_col = 'Date Start' if 'Date Start' in df_filtered.columns else 'Start'
-    date_end_col = 'Date End' if 'Date End' in df_filtered.columns else 'End'
-    
-    df_filtered[date_start_col] = pd.to_datetime(df_filtered[date_start_col], dayfirst=True, errors='coerce')
-    df_filtered[date_end_col] = pd.to_datetime(df_filtered[date_end_col], dayfirst=True, errors='coerce')
+    if partition_index is None:
+        return [df_filtered[date_window_mask(df_filtered[date_start_col], df_filtered[date_end_col], start, end, how=date_match)]
+                for start, end in windows]
 
-    df_filtered = df_filtered[
-        (df_filtered[date_start_col] >= pd.to_datetime(start_date)) &
-        (df_filtered[date_end_col] <= pd.to_datetime(end_date))
-    ]
+    if searched:
+        positions = positions[(mask_desc | mask_camp).to_numpy(dtype=bool)]
+    intervals = partition_intervals(partition_index, df, country, selected_category, date_start_col, date_end_col)
+    slices = []
+    for start, end in windows:
+        window_positions = query_date_intervals(intervals, start, end, how=date_match)
+        if searched:
+            window_positions = window_positions[np.isin(window_positions, positions, assume_unique=True)]
+        slices.append(df.take(window_positions))
+    return slices
 
-    return df_filtered
-
-def estimate_demand(earlier_df, later_df, percentage):
-    earlier_mean = earlier_df['Demand'].mean() if not earlier_df.empty and 'Demand' in earlier_df.columns else 0
-    later_mean = later_df['Demand'].mean() if not later_df.empty and 'Demand' in later_df.columns else 0
-    adjusted_earlier = earlier_mean * (1 + percentage / 100)
-    
-    if earlier_df.empty and later_df.empty:
-        return None
-    elif earlier_df.empty:
-        return later_mean
-    elif later_df.empty:
-        return adjusted_earlier
-    else:
-        return (adjusted_earlier + later_mean) / 2
+def filter_data(df, country, campaign_filter, start_date, end_date, selected_category=None, partition_index=None, date_match='contained'):
+    return filter_data_windows(df, country, campaign_filter, [(start_date, end_date)], selected_category, partition_index, date_match)[0]
 
 def reorder_columns(df):
     # Create a list of desired columns in order, keeping only those that exist
@@ -105,17 +120,104 @@ def reorder_columns(df):
     
     return df[final_order]
 
+@st.fragment
+def estimation_section(df, content_key, earlier_filtered, later_filtered, windows, date_match, selection_cols, columns):
+    # a fragment, so ticking campaigns or changing the growth reruns only this part of the page;
+    # the batch table lives here too so it follows the growth and per-day inputs
+    st.subheader("📈 Target growth from Earlier Period (%)")
+    target_growth = st.number_input(
+        "Enter growth percentage (can be negative):",
+        min_value=-100, max_value=1000, step=1, format="%d", key='target_growth'
+    )
+    per_day = st.toggle("Estimate demand per campaign day", key='per_day')
+    prorate = st.checkbox("Prorate campaigns that run partly outside the period", key='prorate', disabled=not per_day)
+    date_cols = (columns['start_col'], columns['end_col'])
+    selection_section(earlier_filtered, later_filtered, windows, selection_cols, date_cols, target_growth, per_day, prorate)
+    batch_section(df, content_key, windows, date_match, columns, target_growth, per_day, per_day and prorate)
+
+def selection_section(earlier_filtered, later_filtered, windows, selection_cols, date_cols, target_growth, per_day, prorate):
+    unit = "EUR/day" if per_day else "EUR"
+
+    st.subheader("Select campaigns to include from Earlier Period:")
+    if not earlier_filtered.empty:
+        earlier = selection_editor(earlier_filtered, 'earlier', selection_cols,
+                                   period_basis(earlier_filtered, windows[0], *date_cols, per_day, prorate))
+    else:
+        st.info("No campaigns found in the earlier period with the selected filters.")
+        earlier = None
+
+    st.subheader("Select campaigns to include from Later Period:")
+    if not later_filtered.empty:
+        later = selection_editor(later_filtered, 'later', selection_cols,
+                                 period_basis(later_filtered, windows[1], *date_cols, per_day, prorate))
+    else:
+        st.info("No campaigns found in the later period with the selected filters.")
+        later = None
+
+    # live from the selections' running totals; no sub-frame is built for the estimate
+    earlier_mean, earlier_rows = selection_stats(earlier)
+    later_mean, later_rows = selection_stats(later)
+    if not earlier_rows and not later_rows:
+        st.warning("⚠️ No campaigns selected in either period for estimation.")
+        return
+    estimation = float(combine_estimates(earlier_mean, earlier_rows, later_mean, later_rows, target_growth))
+    if np.isnan(estimation):
+        st.warning("⚠️ Unable to calculate estimation with the given data.")
+        return
+    st.success(f"Estimated Demand: **{estimation:.2f} {unit}**")
+    if st.toggle("Show growth scenarios", key='growth_scenarios'):
+        growth_scenarios(earlier, later, target_growth, unit)
+    if st.toggle("Show uncertainty", key='show_uncertainty'):
+        uncertainty(earlier, later, target_growth, unit)
+
+    if st.toggle("Show data used for estimation", key='show_used'):
+        earlier_selected_df = selected_frame(earlier_filtered, earlier)
+        later_selected_df = selected_frame(later_filtered, later)
+
+        if not earlier_selected_df.empty:
+            st.write("Earlier Period Campaigns:")
+            paged_table(earlier_selected_df, 'earlier_used')
+
+        if not later_selected_df.empty:
+            st.write("Later Period Campaigns:")
+            paged_table(later_selected_df, 'later_used')
+
+        combined_df = pd.concat([earlier_selected_df, later_selected_df]).drop_duplicates()
+        csv = combined_df.to_csv(index=False).encode('utf-8')
+        st.download_button(
+            label="📥 Download selected campaigns data as CSV",
+            data=csv,
+            file_name='campaign_estimation_data.csv',
+            mime='text/csv'
+        )
+
+def batch_section(df, content_key, windows, date_match, columns, growth, per_day, prorate):
+    st.subheader("📋 Estimates for every country and category")
+    if st.button("Estimate all"):
+        st.session_state['batch_requested'] = True
+    if st.session_state.get('batch_requested'):
+        result = session_memo('batch_estimates', (content_key, tuple(windows), growth, date_match, per_day, prorate),
+                              lambda: batch_estimates(df, windows[0], windows[1], growth, date_match, per_day, prorate,
+                                                      **columns))
+        paged_table(result, 'batch_table')
+        st.download_button(
+            label="📥 Download all estimates as CSV",
+            data=result.to_csv(index=False).encode('utf-8'),
+            file_name='campaign_estimates.csv',
+            mime='text/csv'
+        )
+
 st.title("📊 Campaign Estimator")
 
 uploaded_file = st.file_uploader("Upload campaign data CSV file", type="csv")
 
 if uploaded_file:
     try:
-        df = load_data(uploaded_file)
-        
-        # Map column names to expected format
-        df = map_column_names(df)
-        
+        # only the upload's key lives in session state; the frame comes from the shared cache on every
+        # rerun, so its evictions actually free memory
+        content_key = upload_key(uploaded_file)
+        df = load_data(content_key, uploaded_file)
+
         # Check for required columns
         required_cols = {'Country', 'Description', 'Demand'}
         date_cols = {'Date Start', 'Date End'} | {'Start', 'End'}
@@ -125,101 +227,51 @@ if uploaded_file:
             st.error(f"❌ Missing required columns. Found: {list(df.columns)}")
             st.info("Expected columns: Country, Description, Demand, and date columns")
         else:
-            df = clean_demand_column(df)
-
             # Display basic info about the data
             st.sidebar.subheader("Data Overview")
             st.sidebar.write(f"Total rows: {len(df)}")
             st.sidebar.write(f"Columns: {list(df.columns)}")
+            if 'demand_format' in df.attrs:
+                st.sidebar.write(f"Demand decimal separator: '{df.attrs['demand_format']['decimal']}'")
             st.sidebar.write(f"Date range: {df['Date Start'].min() if 'Date Start' in df.columns else df['Start'].min()} to {df['Date End'].max() if 'Date End' in df.columns else df['End'].max()}")
 
-            country_list = df['Country'].dropna().unique().tolist()
-            selected_country = st.selectbox("🌍 Select country:", country_list)
-
-            # Handle category column - use 'Category_name' or 'Category'
-            category_col = 'Category_name' if 'Category_name' in df.columns else 'Category'
-            categories = df[category_col].dropna().unique().tolist()
-            categories = sorted(categories)
-            selected_category = st.selectbox("🏷️ Select category:", ["All"] + categories)
-
-            campaign_filter = st.text_input("🔎 Filter campaigns (contains, min 3 letters):")
-
-            st.subheader("⏳ Earlier Period")
-            earlier_start_date = st.date_input("Start date (Earlier Period):", key='earlier_start')
-            earlier_end_date = st.date_input("End date (Earlier Period):", key='earlier_end')
-
-            st.subheader("📈 Target growth from Earlier Period (%)")
-            target_growth = st.number_input(
-                "Enter growth percentage (can be negative):",
-                min_value=-100, max_value=1000, step=1, format="%d"
-            )
-
-            st.subheader("⏳ Later Period")
-            later_start_date = st.date_input("Start date (Later Period):", key='later_start')
-            later_end_date = st.date_input("End date (Later Period):", key='later_end')
-
-            earlier_filtered = filter_data(df, selected_country, campaign_filter, earlier_start_date, earlier_end_date, selected_category)
-            later_filtered = filter_data(df, selected_country, campaign_filter, later_start_date, later_end_date, selected_category)
-
-            earlier_filtered = reorder_columns(earlier_filtered)
-            later_filtered = reorder_columns(later_filtered)
-
-            st.subheader("Select campaigns to include from Earlier Period:")
-            if not earlier_filtered.empty:
-                earlier_selections = {
-                    idx: st.checkbox(
-                        f"{row['Campaign name'] if 'Campaign name' in row else row['Name']} | {row['Description']} | Start: {row['Date Start'].date() if 'Date Start' in row else row['Start'].date()} | End: {row['Date End'].date() if 'Date End' in row else row['End'].date()} | Demand: {row['Demand'] if 'Demand' in row else 'N/A'}",
-                        value=True, key=f"earlier_{idx}"
-                    )
-                    for idx, row in earlier_filtered.iterrows()
-                }
-                earlier_selected_df = earlier_filtered.loc[[idx for idx, checked in earlier_selections.items() if checked]]
-            else:
-                st.info("No campaigns found in the earlier period with the selected filters.")
-                earlier_selected_df = pd.DataFrame()
-
-            st.subheader("Select campaigns to include from Later Period:")
-            if not later_filtered.empty:
-                later_selections = {
-                    idx: st.checkbox(
-                        f"{row['Campaign name'] if 'Campaign name' in row else row['Name']} | {row['Description']} | Start: {row['Date Start'].date() if 'Date Start' in row else row['Start'].date()} | End: {row['Date End'].date() if 'Date End' in row else row['End'].date()} | Demand: {row['Demand'] if 'Demand' in row else 'N/A'}",
-                        value=True, key=f"later_{idx}"
-                    )
-                    for idx, row in later_filtered.iterrows()
-                }
-                later_selected_df = later_filtered.loc[[idx for idx, checked in later_selections.items() if checked]]
-            else:
-                st.info("No campaigns found in the later period with the selected filters.")
-                later_selected_df = pd.DataFrame()
-
-            if st.button("📈 Calculate Estimation"):
-                if earlier_selected_df.empty and later_selected_df.empty:
-                    st.warning("⚠️ No campaigns selected in either period for estimation.")
-                else:
-                    estimation = estimate_demand(earlier_selected_df, later_selected_df, target_growth)
-                    if estimation is None:
-                        st.warning("⚠️ Unable to calculate estimation with the given data.")
-                    else:
-                        st.success(f"Estimated Demand: **{estimation:.2f} EUR**")
-                        st.markdown("### Data used for estimation:")
-
-                        if not earlier_selected_df.empty:
-                            st.write("Earlier Period Campaigns:")
-                            st.dataframe(earlier_selected_df)
-
-                        if not later_selected_df.empty:
-                            st.write("Later Period Campaigns:")
-                            st.dataframe(later_selected_df)
-
-                        if not earlier_selected_df.empty or not later_selected_df.empty:
-                            combined_df = pd.concat([earlier_selected_df, later_selected_df]).drop_duplicates()
-                            csv = combined_df.to_csv(index=False).encode('utf-8')
-                            st.download_button(
-                                label="📥 Download selected campaigns data as CSV",
-                                data=csv,
-                                file_name='campaign_estimation_data.csv',
-                                mime='text/csv'
-                            )
+            # filter inputs are applied together on submit instead of rerunning on every keystroke
+            with st.form('filters'):
+                country_list = category_options(df['Country'])
+                selected_country = st.selectbox("🌍 Select country:", country_list)
+
+                # Handle category column - use 'Category_name' or 'Category'
+                category_col = 'Category_name' if 'Category_name' in df.columns else 'Category'
+                categories = category_options(df[category_col])
+                selected_category = st.selectbox("🏷️ Select category:", ["All"] + categories)
+
+                campaign_filter = st.text_input("🔎 Filter campaigns (contains, min 3 letters):")
+                date_match = st.radio("📅 Include campaigns that:", DATE_MATCH_MODES, index=1, horizontal=True,
+                                      format_func=lambda m: "overlap the period" if m == 'overlap' else "run entirely within the period")
+
+                st.subheader("⏳ Earlier Period")
+                earlier_start_date = st.date_input("Start date (Earlier Period):", key='earlier_start')
+                earlier_end_date = st.date_input("End date (Earlier Period):", key='earlier_end')
+
+                st.subheader("⏳ Later Period")
+                later_start_date = st.date_input("Start date (Later Period):", key='later_start')
+                later_end_date = st.date_input("End date (Later Period):", key='later_end')
+
+                st.form_submit_button("🔄 Apply filters")
+
+            date_start_col = 'Date Start' if 'Date Start' in df.columns else 'Start'
+            date_end_col = 'Date End' if 'Date End' in df.columns else 'End'
+            windows = [(earlier_start_date, earlier_end_date), (later_start_date, later_end_date)]
+            filter_inputs = (content_key, selected_country, selected_category, campaign_filter, date_match, tuple(windows))
+            earlier_filtered, later_filtered = session_memo('filtered_periods', filter_inputs, lambda: [
+                reorder_columns(s) for s in filter_data_windows(
+                    df, selected_country, campaign_filter, windows, selected_category,
+                    get_partition_index(content_key, df), date_match)])
+
+            name_col = 'Campaign name' if 'Campaign name' in df.columns else 'Name'
+            estimation_section(df, content_key, earlier_filtered, later_filtered, windows, date_match,
+                               [name_col, 'Description', date_start_col, date_end_col, 'Demand'],
+                               {'category_col': category_col, 'start_col': date_start_col, 'end_col': date_end_col})
     except Exception as e:
         st.error(f"❌ Error processing file: {e}")
         st.info("Please check that your CSV file has the correct format with columns like: Start, End, Country, Name, Description, Category, Demand")
\ No newline at end of file
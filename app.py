@@ -1,134 +1,93 @@
 import streamlit as st
 import pandas as pd
-import io
-from openpyxl import load_workbook
+import numpy as np
 from datetime import datetime
-import re
 import uuid
+from excel_readers import load_excel_frame
+import upload_cache
+from frame_cache import FrameCache, FRAME_CACHE_MAX_ENTRIES
+from demand_parsing import parse_demand_series
+from campaign_frame import (parse_date_columns, normalize_text_columns, encode_categoricals,
+                            category_options, search_key, drop_search_keys, enable_copy_on_write)
+from campaign_index import build_partition_index, build_trigram_index, trigram_index_nbytes, DATE_MATCH_MODES
+from campaign_filters import filter_data_windows, search_pattern
+from campaign_selection import selection_editor, selection_stats, selected_frame
+from campaign_tables import paged_table
+from campaign_estimates import growth_scenarios, period_basis, uncertainty
+from session_memo import session_memo, upload_key
+from estimation import batch_estimates, combine_estimates
+
+enable_copy_on_write()
+
+# bump whenever load/clean output changes so stale disk-cache entries are not reused
+CLEANING_VERSION = '8'
 
 st.set_page_config(page_title="📊 Campaign demand estimation app", layout="wide")
 
 if 'session_id' not in st.session_state:
     st.session_state['session_id'] = str(uuid.uuid4())
 
-def clear_cache_and_session():
-    st.cache_data.clear()
-    st.cache_resource.clear()
+def clear_session():
+    # parsed frames live in the shared bounded cache; only drop this session's own state
     st.session_state.clear()
 
 if '_on_session_end_registered' not in st.session_state:
     st.session_state['_on_session_end_registered'] = True
     try:
-        st.runtime.scriptrunner.script_run_context.get_script_run_ctx().on_session_end(clear_cache_and_session)
+        st.runtime.scriptrunner.script_run_context.get_script_run_ctx().on_session_end(clear_session)
     except Exception:
         pass
 
-@st.cache_data
-def load_excel_and_unmerge(file_bytes):
-    wb = load_workbook(io.BytesIO(file_bytes), data_only=True)
-    ws = wb.active
-
-    for merged_range in list(ws.merged_cells.ranges):
-        tl_row = merged_range.min_row
-        tl_col = merged_range.min_col
-        top_left_value = ws.cell(row=tl_row, column=tl_col).value
-        ws.unmerge_cells(range_string=str(merged_range))
-        for r in ws.iter_rows(min_row=merged_range.min_row,
-                              max_row=merged_range.max_row,
-                              min_col=merged_range.min_col,
-                              max_col=merged_range.max_col):
-            for cell in r:
-                cell.value = top_left_value
-
-    for col in ws.columns:
-        prev_value = None
-        for cell in col:
-            if cell.value is not None:
-                prev_value = cell.value
-            else:
-                cell.value = prev_value
+@st.cache_resource
+def get_frame_cache():
+    return FrameCache()
 
-    data_iter = ws.values
-    try:
-        headers = next(data_iter)
-    except StopIteration:
-        wb.close()
-        return pd.DataFrame()
-    df = pd.DataFrame(data_iter, columns=headers)
-    wb.close()
-
-    df = df.ffill(axis=0)
-    df.columns = df.columns.astype(str).str.strip().str.replace(r'[\u00A0\u202F]', '', regex=True)
-    return df
+def load_excel_and_unmerge(file_bytes):
+    return load_excel_frame(file_bytes)
 
 def clean_demand_column(df, demand_col='Demand'):
-    def parse_demand(val):
-        if pd.isna(val):
-            return None
-        if isinstance(val, (int, float)) and not isinstance(val, bool):
-            return float(val)
-        s = str(val)
-        s = s.replace('\u00A0', '').replace('\u202F', '').replace(' ', '')
-        s = re.sub(r'[^\d,.\-]', '', s)
-        if s.count(',') == 1 and s.count('.') == 0:
-            s = s.replace(',', '.')
-        if s in ['', '-', '.', ',']:
-            return None
-        try:
-            num = float(s)
-            if abs(num) > 1e12:
-                return None
-            return num
-        except ValueError:
-            return None
-
     if demand_col in df.columns:
-        df[demand_col] = df[demand_col].apply(parse_demand)
+        parsed = parse_demand_series(df[demand_col])
+        df[demand_col] = parsed
+        df.attrs['demand_format'] = parsed.attrs['number_format']._asdict()
     else:
         st.warning(f"Column '{demand_col}' not found.")
     return df
 
-def filter_data(df, country, search_filter, start_date, end_date, selected_category=None):
-    if 'Country' not in df.columns:
-        return pd.DataFrame()
-
-    df_filtered = df[df['Country'] == country].copy()
-
-    for col in ['Name', 'Description', 'Category']:
-        if col in df_filtered.columns:
-            df_filtered[col] = df_filtered[col].astype(str).str.strip().str.replace(r'[\u00A0\u202F]', '', regex=True)
-
-    if selected_category and selected_category != "All" and 'Category' in df_filtered.columns:
-        df_filtered = df_filtered[df_filtered['Category'].str.lower() == selected_category.strip().lower()]
-
-    if search_filter and len(search_filter.strip()) >= 3:
-        pattern = search_filter.strip().replace('\u00A0', '').replace('\u202F', '')
-        name_mask = df_filtered['Name'].str.contains(pattern, case=False, na=False, regex=False) if 'Name' in df_filtered.columns else pd.Series(False, index=df_filtered.index)
-        desc_mask = df_filtered['Description'].str.contains(pattern, case=False, na=False, regex=False) if 'Description' in df_filtered.columns else pd.Series(False, index=df_filtered.index)
-        df_filtered = df_filtered[name_mask | desc_mask]
-
-    if 'Start' in df_filtered.columns and 'End' in df_filtered.columns:
-        df_filtered['Start'] = pd.to_datetime(df_filtered['Start'], dayfirst=True, errors='coerce')
-        df_filtered['End'] = pd.to_datetime(df_filtered['End'], dayfirst=True, errors='coerce')
-        start_ts = pd.to_datetime(start_date)
-        end_ts = pd.to_datetime(end_date)
-        df_filtered = df_filtered[(df_filtered['End'] >= start_ts) & (df_filtered['Start'] <= end_ts)]
-
-    return df_filtered
-
-def estimate_demand(earlier_df, later_df, percentage):
-    earlier_mean = earlier_df['Demand'].mean() if (earlier_df is not None and not earlier_df.empty) else 0
-    later_mean = later_df['Demand'].mean() if (later_df is not None and not later_df.empty) else 0
-    adjusted_earlier = earlier_mean * (1 + percentage / 100)
-    if (earlier_df is None or earlier_df.empty) and (later_df is None or later_df.empty):
-        return None
-    if earlier_df is None or earlier_df.empty:
-        return later_mean
-    if later_df is None or later_df.empty:
-        return adjusted_earlier
-    return (adjusted_earlier + later_mean) / 2
+def load_campaign_data(key, uploaded_file):
+    """Frame for an upload whose content key is already known; the bytes are only read on a cache miss."""
+    frame_cache = get_frame_cache()
+    df = frame_cache.get(key)
+    if df is not None:
+        return df
+    df = upload_cache.load(key)
+    if df is None:
+        df = load_excel_and_unmerge(uploaded_file.getvalue())
+        if not df.empty and 'Demand' in df.columns:
+            df = clean_demand_column(df, demand_col='Demand')
+        df = parse_date_columns(df, ['Start', 'End'])
+        df = normalize_text_columns(df)
+        df = encode_categoricals(df)
+        upload_cache.store(key, df)
+    df.attrs['content_key'] = key
+    frame_cache.put(key, df)
+    return df.copy(deep=False)
+
+@st.cache_resource(max_entries=FRAME_CACHE_MAX_ENTRIES)
+def get_partition_index(content_key, _df):
+    return build_partition_index(_df)
+
+def get_trigram_index(content_key, df):
+    # built on the first search only, and kept in the frame cache so it counts against the same byte budget
+    frame_cache = get_frame_cache()
+    index = frame_cache.get((content_key, 'trigrams'))
+    if index is None:
+        index = build_trigram_index(df, [search_key('Name'), search_key('Description')])
+        frame_cache.put((content_key, 'trigrams'), index, trigram_index_nbytes(index))
+    return index
 
 def reorder_columns(df):
+    df = drop_search_keys(df)
     cols = df.columns.tolist()
     if 'Name' in cols and 'Description' in cols:
         cols.remove('Description')
@@ -137,91 +96,135 @@ def reorder_columns(df):
         return df[cols]
     return df
 
+@st.fragment
+def estimation_section(df, earlier_filtered, later_filtered, windows, date_match):
+    # a fragment, so ticking campaigns or changing the growth reruns only this part of the page;
+    # the batch table lives here too so it follows the growth and per-day inputs
+    st.subheader("📈 Target growth from Earlier Period (%)")
+    target_growth = st.number_input("Enter growth percentage (can be negative):", min_value=-100, max_value=1000, step=1, format="%d", key='target_growth')
+    per_day = st.toggle("Estimate demand per campaign day", key='per_day')
+    prorate = st.checkbox("Prorate campaigns that run partly outside the period", key='prorate', disabled=not per_day)
+    selection_section(earlier_filtered, later_filtered, windows, target_growth, per_day, prorate)
+    batch_section(df, windows, date_match, target_growth, per_day, per_day and prorate)
+
+def selection_section(earlier_filtered, later_filtered, windows, target_growth, per_day, prorate):
+    unit = "EUR/day" if per_day else "EUR"
+    selection_cols = ['Name', 'Description', 'Start', 'End', 'Demand']
+    date_cols = ('Start', 'End')
+    st.subheader("Select campaigns to include from Earlier Period:")
+    earlier = selection_editor(earlier_filtered, 'earlier', selection_cols,
+                               period_basis(earlier_filtered, windows[0], *date_cols, per_day, prorate))
+
+    st.subheader("Select campaigns to include from Later Period:")
+    later = selection_editor(later_filtered, 'later', selection_cols,
+                             period_basis(later_filtered, windows[1], *date_cols, per_day, prorate))
+
+    # live from the selections' running totals; no sub-frame is built for the estimate
+    earlier_mean, earlier_rows = selection_stats(earlier)
+    later_mean, later_rows = selection_stats(later)
+    if not earlier_rows and not later_rows:
+        st.warning("No campaigns selected in either period for estimation.")
+        return
+    estimation = float(combine_estimates(earlier_mean, earlier_rows, later_mean, later_rows, target_growth))
+    if np.isnan(estimation):
+        st.warning("Unable to calculate estimation with the given data.")
+        return
+    st.success(f"Estimated Demand: {estimation:,.2f} {unit}")
+    if st.toggle("Show growth scenarios", key='growth_scenarios'):
+        growth_scenarios(earlier, later, target_growth, unit)
+    if st.toggle("Show uncertainty", key='show_uncertainty'):
+        uncertainty(earlier, later, target_growth, unit)
+    if st.toggle("Show data used for estimation", key='show_used'):
+        earlier_selected_df = selected_frame(earlier_filtered, earlier)
+        later_selected_df = selected_frame(later_filtered, later)
+        if not earlier_selected_df.empty:
+            st.write("Earlier Period Campaigns:")
+            paged_table(earlier_selected_df, 'earlier_used')
+        if not later_selected_df.empty:
+            st.write("Later Period Campaigns:")
+            paged_table(later_selected_df, 'later_used')
+        combined_df = pd.concat([earlier_selected_df, later_selected_df]).drop_duplicates()
+        csv = combined_df.to_csv(index=False).encode('utf-8')
+        st.download_button(label="📥 Download selected campaigns data as CSV", data=csv, file_name='campaign_estimation_data.csv', mime='text/csv')
+
+def batch_section(df, windows, date_match, growth, per_day, prorate):
+    st.subheader("📋 Estimates for every country and category")
+    if st.button("Estimate all"):
+        st.session_state['batch_requested'] = True
+    if st.session_state.get('batch_requested'):
+        result = session_memo('batch_estimates', (df.attrs['content_key'], tuple(windows), growth, date_match, per_day, prorate),
+                              lambda: batch_estimates(df, windows[0], windows[1], growth, date_match, per_day, prorate))
+        paged_table(result, 'batch_table')
+        st.download_button(label="📥 Download all estimates as CSV", data=result.to_csv(index=False).encode('utf-8'),
+                           file_name='campaign_estimates.csv', mime='text/csv')
+
 st.title("📊 Campaign demand estimation app")
 
+with st.sidebar.expander("Cache stats"):
+    stats = get_frame_cache().stats()
+    st.write(f"Hits: {stats['hits']} | Misses: {stats['misses']} | Evictions: {stats['evictions']}")
+    st.write(f"Frames held: {stats['entries']} ({stats['bytes'] / 1024 ** 2:,.1f} MB)")
+
 uploaded_file = st.file_uploader("📂 Upload campaign data Excel file (.xlsx/.xls)", type=["xlsx", "xls"])
 
 if uploaded_file is not None:
     try:
-        raw_bytes = uploaded_file.read()
-        df = load_excel_and_unmerge(raw_bytes)
+        # only the upload's key lives in session state; the frame comes from the shared cache on every
+        # rerun, so its evictions actually free memory and every rerun shows up in the cache stats
+        content_key = upload_key(uploaded_file, salt=CLEANING_VERSION)
+        df = load_campaign_data(content_key, uploaded_file)
 
         if df.empty:
             st.error("No data read from Excel.")
         else:
-            df.columns = df.columns.astype(str).str.strip().str.replace(r'[\u00A0\u202F]', '', regex=True)
+            st.caption(f"Parsed with the {df.attrs.get('excel_engine', 'openpyxl')} engine.")
+            if 'demand_format' in df.attrs:
+                fmt = df.attrs['demand_format']
+                currency = f", currency {fmt['currency']}" if fmt['currency'] else ""
+                st.caption(f"Demand read with '{fmt['decimal']}' as decimal separator{currency}.")
+            df.columns = df.columns.astype(str).str.strip().str.replace('[\u00A0\u202F]', '', regex=True)
 
             required_cols = {'Country', 'Name', 'Description', 'Start', 'End', 'Demand'}
             missing = required_cols - set(df.columns)
             if missing:
                 st.error(f"Missing required columns: {missing}")
             else:
-                df = clean_demand_column(df, demand_col='Demand')
-                country_list = df['Country'].dropna().unique().tolist()
-                selected_country = st.selectbox("🌍 Select country:", country_list)
+                # filter inputs are applied together on submit instead of rerunning on every keystroke
+                with st.form('filters'):
+                    country_list = category_options(df['Country'])
+                    selected_country = st.selectbox("🌍 Select country:", country_list)
 
-                categories = df['Category'].dropna().unique().tolist() if 'Category' in df.columns else []
-                categories = sorted(categories)
-                selected_category = st.selectbox("🏷️ Select category:", ["All"] + categories)
+                    categories = category_options(df['Category']) if 'Category' in df.columns else []
+                    selected_category = st.selectbox("🏷️ Select category:", ["All"] + categories)
 
-                search_filter = st.text_input("🔎 Search campaigns by name or description (min 3 letters):")
+                    search_filter = st.text_input("🔎 Search campaigns by name or description (min 3 letters):")
+                    date_match = st.radio("📅 Include campaigns that:", DATE_MATCH_MODES, index=0, horizontal=True,
+                                          format_func=lambda m: "overlap the period" if m == 'overlap' else "run entirely within the period")
 
-                st.subheader("⏳ Earlier Period")
-                earlier_start_date = st.date_input("Start date (Earlier Period):", key='earlier_start')
-                earlier_end_date = st.date_input("End date (Earlier Period):", key='earlier_end')
+                    st.subheader("⏳ Earlier Period")
+                    earlier_start_date = st.date_input("Start date (Earlier Period):", key='earlier_start')
+                    earlier_end_date = st.date_input("End date (Earlier Period):", key='earlier_end')
 
-                st.subheader("⏳ Later Period")
-                later_start_date = st.date_input("Start date (Later Period):", key='later_start')
-                later_end_date = st.date_input("End date (Later Period):", key='later_end')
+                    st.subheader("⏳ Later Period")
+                    later_start_date = st.date_input("Start date (Later Period):", key='later_start')
+                    later_end_date = st.date_input("End date (Later Period):", key='later_end')
 
-                st.subheader("📈 Target growth from Earlier Period (%)")
-                target_growth = st.number_input("Enter growth percentage (can be negative):", min_value=-100, max_value=1000, step=1, format="%d")
+                    st.form_submit_button("🔄 Apply filters")
 
-                earlier_filtered = filter_data(df, selected_country, search_filter, earlier_start_date, earlier_end_date, selected_category)
-                later_filtered = filter_data(df, selected_country, search_filter, later_start_date, later_end_date, selected_category)
-
-                earlier_filtered = reorder_columns(earlier_filtered)
-                later_filtered = reorder_columns(later_filtered)
+                windows = [(earlier_start_date, earlier_end_date), (later_start_date, later_end_date)]
+                filter_inputs = (content_key, selected_country, selected_category, search_filter, date_match, tuple(windows))
+                earlier_filtered, later_filtered = session_memo('filtered_periods', filter_inputs, lambda: [
+                    reorder_columns(s) for s in filter_data_windows(
+                        df, selected_country, search_filter, windows, selected_category,
+                        get_partition_index(content_key, df), date_match,
+                        get_trigram_index(content_key, df) if search_pattern(search_filter) else None)])
 
                 st.subheader("Earlier Period (filtered):")
-                st.dataframe(earlier_filtered.head(200))
+                paged_table(earlier_filtered, 'earlier_table')
 
                 st.subheader("Later Period (filtered):")
-                st.dataframe(later_filtered.head(200))
-
-                st.subheader("Select campaigns to include from Earlier Period:")
-                earlier_selections = {}
-                for idx, row in earlier_filtered.iterrows():
-                    label = f"{row.get('Name','')} | {row.get('Description','')} | Start: {row.get('Start','')} | End: {row.get('End','')} | Demand: {row.get('Demand','')}"
-                    earlier_selections[idx] = st.checkbox(label, value=True, key=f"earlier_{idx}")
-
-                st.subheader("Select campaigns to include from Later Period:")
-                later_selections = {}
-                for idx, row in later_filtered.iterrows():
-                    label = f"{row.get('Name','')} | {row.get('Description','')} | Start: {row.get('Start','')} | End: {row.get('End','')} | Demand: {row.get('Demand','')}"
-                    later_selections[idx] = st.checkbox(label, value=True, key=f"later_{idx}")
-
-                earlier_selected_df = earlier_filtered.loc[[i for i,v in earlier_selections.items() if v]] if earlier_selections else pd.DataFrame()
-                later_selected_df = later_filtered.loc[[i for i,v in later_selections.items() if v]] if later_selections else pd.DataFrame()
-
-                if st.button("📈 Calculate Estimation"):
-                    if earlier_selected_df.empty and later_selected_df.empty:
-                        st.warning("No campaigns selected in either period for estimation.")
-                    else:
-                        estimation = estimate_demand(earlier_selected_df, later_selected_df, target_growth)
-                        if estimation is None:
-                            st.warning("Unable to calculate estimation with the given data.")
-                        else:
-                            st.success(f"Estimated Demand: {estimation:,.2f} EUR")
-                            st.markdown("### Data used for estimation:")
-                            if not earlier_selected_df.empty:
-                                st.write("Earlier Period Campaigns:")
-                                st.dataframe(earlier_selected_df)
-                            if not later_selected_df.empty:
-                                st.write("Later Period Campaigns:")
-                                st.dataframe(later_selected_df)
-                            combined_df = pd.concat([earlier_selected_df, later_selected_df]).drop_duplicates()
-                            csv = combined_df.to_csv(index=False).encode('utf-8')
-                            st.download_button(label="📥 Download selected campaigns data as CSV", data=csv, file_name='campaign_estimation_data.csv', mime='text/csv')
+                paged_table(later_filtered, 'later_table')
+
+                estimation_section(df, earlier_filtered, later_filtered, windows, date_match)
     except Exception as e:
         st.error(f"Error processing file: {e}")
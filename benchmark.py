@@ -0,0 +1,374 @@
+"""Ad-hoc timings for the data pipeline. Run with `python benchmark.py`."""
+import io
+import re
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from openpyxl import Workbook
+
+from campaign_filters import filter_data_windows
+from campaign_frame import (drop_search_keys, encode_categoricals, enable_copy_on_write,
+                            normalize_text_columns, parse_date_columns, search_key)
+from campaign_index import build_partition_index, build_trigram_index, trigram_index_nbytes
+from campaign_selection import new_selection, selection_stats, set_included
+from demand_parsing import parse_demand_series
+from estimation import GROWTH_SWEEP, batch_estimates, bootstrap_estimate, combine_estimates, growth_curve
+from excel_readers import available_engines, load_excel_frame
+
+COLUMNS = ['Country', 'Name', 'Description', 'Start', 'End', 'Demand', 'Category']
+COUNTRIES = ['PL', 'DE', 'FR', 'ES', 'IT', 'CZ', 'SK', 'HU']
+CATEGORIES = ['Toys', 'Garden', 'Kitchen', 'Sports', 'Books', 'Fashion']
+
+
+def synthetic_rows(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    base = datetime(2023, 1, 1)
+    starts = rng.integers(0, 730, n_rows)
+    lengths = rng.integers(1, 60, n_rows)
+    demand = rng.gamma(2.0, 5000.0, n_rows).round(2)
+    for i in range(n_rows):
+        start = base + timedelta(days=int(starts[i]))
+        yield [
+            COUNTRIES[i % len(COUNTRIES)],
+            f"Campaign {i}",
+            f"{CATEGORIES[i % len(CATEGORIES)]} promo week {i % 52}",
+            start,
+            start + timedelta(days=int(lengths[i])),
+            f"{demand[i]:,.2f} €".replace(',', '\u00A0').replace('.', ',') if i % 3 else float(demand[i]),
+            CATEGORIES[i % len(CATEGORIES)],
+        ]
+
+
+def synthetic_xlsx(n_rows):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(COLUMNS)
+    for row in synthetic_rows(n_rows):
+        ws.append(row)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def synthetic_xls(n_rows):
+    import xlwt
+    wb = xlwt.Workbook()
+    ws = wb.add_sheet('Campaigns')
+    date_style = xlwt.easyxf(num_format_str='DD.MM.YYYY')
+    for c, name in enumerate(COLUMNS):
+        ws.write(0, c, name)
+    for r, row in enumerate(synthetic_rows(n_rows), start=1):
+        for c, value in enumerate(row):
+            if isinstance(value, datetime):
+                ws.write(r, c, value, date_style)
+            else:
+                ws.write(r, c, value)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def timed(fn, *args, repeat=3, **kwargs):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_excel_readers(n_rows=100_000):
+    print(f"Excel readers ({n_rows:,} rows)")
+    files = {'xlsx': synthetic_xlsx(n_rows)}
+    try:
+        # legacy .xls sheets stop at 65,536 rows
+        files['xls'] = synthetic_xls(min(n_rows, 65_535))
+    except ImportError:
+        print("  xlwt not installed, skipping .xls")
+    for file_format, file_bytes in files.items():
+        for engine in available_engines(file_format):
+            seconds = timed(load_excel_frame, file_bytes, engine=engine, repeat=1)
+            print(f"  {file_format:<5} {engine:<9} {seconds:8.2f} s")
+
+
+# Row-wise Demand parsers the apps used before the vectorised versions, kept as the reference
+# for tests/test_demand_parsing.py and the timings below.
+
+def legacy_parse_demand(val):
+    if pd.isna(val):
+        return None
+    if isinstance(val, (int, float)) and not isinstance(val, bool):
+        return float(val)
+    s = str(val)
+    s = s.replace('\u00A0', '').replace('\u202F', '').replace(' ', '')
+    s = re.sub(r'[^\d,.\-]', '', s)
+    if s.count(',') == 1 and s.count('.') == 0:
+        s = s.replace(',', '.')
+    if s in ['', '-', '.', ',']:
+        return None
+    try:
+        num = float(s)
+        if abs(num) > 1e12:
+            return None
+        return num
+    except ValueError:
+        return None
+
+
+def legacy_parse_demand_eu(val):
+    if pd.isna(val):
+        return None
+    val = str(val)
+    val = val.replace('€', '').replace(' ', '')
+    val = val.replace('.', '').replace(',', '.')
+    try:
+        return float(val)
+    except ValueError:
+        return None
+
+
+def bench_demand_parsing(n_rows=500_000):
+    print(f"Demand parsing ({n_rows:,} rows)")
+    # equivalence with the legacy parsers is covered by tests/test_demand_parsing.py
+    column = pd.Series([row[5] for row in synthetic_rows(n_rows)], dtype=object)
+    after = timed(parse_demand_series, column)
+    for label, legacy in [('app', legacy_parse_demand), ('v2', legacy_parse_demand_eu)]:
+        before = timed(column.apply, legacy, repeat=1)
+        print(f"  {label:<5} row-wise {before:6.2f} s   vectorised {after:6.2f} s   x{before / after:5.1f}")
+
+
+def synthetic_frame(n_rows):
+    """Raw frame as it comes out of the Excel reader, dates as text."""
+    df = pd.DataFrame(list(synthetic_rows(n_rows)), columns=COLUMNS)
+    for col in ['Start', 'End']:
+        df[col] = df[col].dt.strftime('%d.%m.%Y').astype(object)
+    return df
+
+
+def prepared_frame(raw):
+    """The same ingestion steps app.load_campaign_data applies."""
+    df = raw.copy()
+    df['Demand'] = parse_demand_series(df['Demand'])
+    df = parse_date_columns(df, ['Start', 'End'])
+    df = normalize_text_columns(df)
+    return encode_categoricals(df)
+
+
+# app.py's filter_data and reorder_columns before the copy-free filter path.
+
+def legacy_filter_data(df, country, search_filter, start_date, end_date, selected_category=None):
+    df_filtered = df[df['Country'] == country].copy()
+    for col in ['Name', 'Description', 'Category']:
+        df_filtered[col] = df_filtered[col].astype(str).str.strip().str.replace('[\u00A0\u202F]', '', regex=True)
+    if selected_category and selected_category != "All":
+        df_filtered = df_filtered[df_filtered['Category'].str.lower() == selected_category.strip().lower()]
+    if search_filter and len(search_filter.strip()) >= 3:
+        pattern = search_filter.strip()
+        name_mask = df_filtered['Name'].str.contains(pattern, case=False, na=False, regex=False)
+        desc_mask = df_filtered['Description'].str.contains(pattern, case=False, na=False, regex=False)
+        df_filtered = df_filtered[name_mask | desc_mask]
+    df_filtered['Start'] = pd.to_datetime(df_filtered['Start'], dayfirst=True, errors='coerce')
+    df_filtered['End'] = pd.to_datetime(df_filtered['End'], dayfirst=True, errors='coerce')
+    return df_filtered[(df_filtered['End'] >= pd.to_datetime(start_date)) & (df_filtered['Start'] <= pd.to_datetime(end_date))]
+
+
+def reorder_columns(df):
+    df = drop_search_keys(df)
+    cols = df.columns.tolist()
+    cols.remove('Description')
+    cols.insert(cols.index('Name') + 1, 'Description')
+    return df[cols]
+
+
+def peak_allocation(fn, *args):
+    # NumPy buffers and Python objects only; Arrow-backed string buffers bypass tracemalloc
+    tracemalloc.start()
+    try:
+        result = fn(*args)
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def arrow_allocation(fn, *args):
+    # bytes Arrow allocated while fn ran (str columns live there); the pool's max_memory() cannot be reset
+    pool = pa.default_memory_pool()
+    before = pool.total_bytes_allocated()
+    fn(*args)
+    return pool.total_bytes_allocated() - before
+
+
+def bench_filter_rerun(n_rows=300_000):
+    print(f"Filtering one rerun, two periods ({n_rows:,} rows)")
+    enable_copy_on_write()
+    raw = synthetic_frame(n_rows)
+    df = prepared_frame(raw)
+    index = build_partition_index(df)
+    trigrams, build_peak = peak_allocation(build_trigram_index, df, [search_key('Name'), search_key('Description')])
+    print(f"  trigram index {trigram_index_nbytes(trigrams) / 2 ** 20:.1f} MiB for a"
+          f" {df.memory_usage(deep=True).sum() / 2 ** 20:.1f} MiB frame, {build_peak / 2 ** 20:.1f} MiB peak to build")
+    windows = [(datetime(2023, 1, 1), datetime(2023, 6, 30)), (datetime(2024, 1, 1), datetime(2024, 6, 30))]
+
+    for search in ['', 'week 1']:
+        def legacy_rerun():
+            return [reorder_columns(legacy_filter_data(raw, 'PL', search, start, end, 'Toys')) for start, end in windows]
+
+        def rerun():
+            return [reorder_columns(s) for s in filter_data_windows(df, 'PL', search, windows, 'Toys', index,
+                                                                      trigram_index=trigrams)]
+
+        before, after = legacy_rerun(), rerun()
+        assert [len(s) for s in before] == [len(s) for s in after], "filter results differ"
+        t_before, t_after = timed(legacy_rerun), timed(rerun)
+        label = f"search={search!r}"
+        for name, fn, seconds in [('legacy', legacy_rerun, t_before), ('indexed', rerun, t_after)]:
+            _, traced = peak_allocation(fn)
+            print(f"  {label:<16} {name:<8} {seconds * 1000:7.1f} ms   {traced / 2 ** 20:6.1f} MiB traced peak"
+                  f"   {arrow_allocation(fn) / 2 ** 20:6.1f} MiB Arrow allocated")
+
+
+def estimate_demand(earlier_df, later_df, percentage):
+    # the apps' former per-selection estimate, the reference for the vectorised rule
+    if earlier_df.empty and later_df.empty:
+        return None
+    adjusted_earlier = (earlier_df['Demand'].mean() if not earlier_df.empty else 0) * (1 + percentage / 100)
+    if earlier_df.empty:
+        return later_df['Demand'].mean()
+    if later_df.empty:
+        return adjusted_earlier
+    return (adjusted_earlier + later_df['Demand'].mean()) / 2
+
+
+def loaded_frame(n_rows, seed=0):
+    """A cleaned campaign frame built directly with NumPy, for benchmarks that start after loading."""
+    rng = np.random.default_rng(seed)
+    starts = np.datetime64('2023-01-01', 'ns') + rng.integers(0, 730, n_rows).astype('timedelta64[D]')
+    return encode_categoricals(normalize_text_columns(pd.DataFrame({
+        'Country': np.array(COUNTRIES)[rng.integers(0, len(COUNTRIES), n_rows)],
+        'Category': np.array(CATEGORIES)[rng.integers(0, len(CATEGORIES), n_rows)],
+        'Start': starts,
+        'End': starts + rng.integers(1, 60, n_rows).astype('timedelta64[D]'),
+        'Demand': rng.gamma(2.0, 5000.0, n_rows).round(2),
+    }), ['Category']))
+
+
+def bench_batch_estimation(n_rows=1_000_000):
+    print(f"Estimates for every country x category ({n_rows:,} rows)")
+    df = loaded_frame(n_rows)
+    earlier, later = (datetime(2023, 1, 1), datetime(2023, 3, 31)), (datetime(2024, 1, 1), datetime(2024, 3, 31))
+
+    def one_pair_at_a_time():
+        # including the partition index the apps build once per file
+        index = build_partition_index(df)
+        return [estimate_demand(filter_data_windows(df, country, '', [earlier], category, index)[0],
+                                filter_data_windows(df, country, '', [later], category, index)[0], 10)
+                for country in COUNTRIES for category in CATEGORIES]
+
+    before = timed(one_pair_at_a_time, repeat=1)
+    after = timed(batch_estimates, df, earlier, later, 10)
+    print(f"  {len(COUNTRIES) * len(CATEGORIES)} pairs: one at a time {before:6.2f} s   batch {after:6.2f} s")
+
+
+def bench_growth_sweep(n_rows=5_000):
+    low, high = GROWTH_SWEEP
+    print(f"Growth sweep {low}%..{high}% ({n_rows:,} selected campaigns per period)")
+    df = loaded_frame(2 * n_rows)
+    earlier, later = df.iloc[:n_rows], df.iloc[n_rows:]
+
+    def one_growth_at_a_time():
+        return [estimate_demand(earlier, later, growth) for growth in range(low, high + 1)]
+
+    def sweep():
+        return growth_curve(earlier['Demand'].mean(), len(earlier), later['Demand'].mean(), len(later))['estimate']
+
+    before, after = timed(one_growth_at_a_time), timed(sweep)
+    print(f"  {high - low + 1} scenarios: one at a time {before * 1000:7.2f} ms   swept {after * 1000:7.2f} ms")
+
+
+def bench_selection_toggles(n_rows=50_000, n_toggles=1_000):
+    print(f"Selection toggles ({n_rows:,} campaigns, {n_toggles:,} toggles)")
+    df = loaded_frame(n_rows)
+    df.loc[df.index[::97], 'Demand'] = np.nan
+    rng = np.random.default_rng(1)
+    toggles = [(int(p), bool(v)) for p, v in zip(rng.integers(0, n_rows, n_toggles), rng.integers(0, 2, n_toggles))]
+
+    def recompute_each_time():
+        include = np.ones(n_rows, dtype=bool)
+        for position, value in toggles:
+            include[position] = value
+            mean = df.loc[df.index[include], 'Demand'].mean()
+        return mean, int(include.sum())
+
+    def running_totals():
+        selection = new_selection(df['Demand'])
+        for position, value in toggles:
+            set_included(selection, [position], value)
+            stats = selection_stats(selection)
+        return stats
+
+    before, after = timed(recompute_each_time, repeat=1), timed(running_totals, repeat=1)
+    print(f"  per toggle: recompute {before / n_toggles * 1000:7.3f} ms   running totals {after / n_toggles * 1000:7.3f} ms")
+
+
+def loop_bootstrap(earlier_values, later_values, percentage, replicates, confidence, seed):
+    # one replicate at a time, drawing from the generator in the same order as bootstrap_estimate
+    rng = np.random.default_rng(seed)
+    means = {}
+    for period, values in [('earlier', earlier_values), ('later', later_values)]:
+        means[period] = [values[rng.integers(0, len(values), len(values))].mean() for _ in range(replicates)]
+    estimates = [combine_estimates(e, len(earlier_values), l, len(later_values), percentage)
+                 for e, l in zip(means['earlier'], means['later'])]
+    tail = (1 - confidence) / 2 * 100
+    return np.percentile(estimates, [tail, 100 - tail])
+
+
+def bench_bootstrap(selections=((40, 60), (300, 500), (2_000, 3_000)), replicates=2_000):
+    print(f"Bootstrap intervals ({replicates:,} replicates)")
+    rng = np.random.default_rng(2)
+    for n_earlier, n_later in selections:
+        earlier, later = rng.gamma(2.0, 5000.0, n_earlier), rng.gamma(2.0, 5000.0, n_later)
+        before = timed(loop_bootstrap, earlier, later, 10, replicates, 0.95, 7, repeat=1)
+        after = timed(bootstrap_estimate, earlier, later, 10, replicates, 0.95, 7)
+        assert after < 1.0, f"bootstrap of {n_earlier}+{n_later} campaigns took {after:.2f} s"
+        print(f"  {n_earlier:>5,} + {n_later:>5,} campaigns: loop {before:6.3f} s   vectorised {after:6.3f} s")
+
+
+def row_wise_per_day_mean(df, window, prorate):
+    # one campaign at a time, the way a per-row apply would do it
+    window_start, window_end = pd.Timestamp(window[0]), pd.Timestamp(window[1])
+    total = weight = 0.0
+    for start, end, demand in zip(df['Start'], df['End'], df['Demand']):
+        days = (end - start).days + 1
+        if pd.isna(demand) or days <= 0:
+            continue
+        w = max((min(end, window_end) - max(start, window_start)).days + 1, 0) if prorate else 1
+        total += demand / days * w
+        weight += w
+    return total / weight if weight else np.nan
+
+
+def bench_per_day_estimation(n_rows=1_000_000):
+    print(f"Per-day estimates for every country x category ({n_rows:,} rows)")
+    df = loaded_frame(n_rows)
+    earlier, later = (datetime(2023, 1, 1), datetime(2023, 3, 31)), (datetime(2024, 1, 1), datetime(2024, 3, 31))
+    index = build_partition_index(df)
+    campaigns = [filter_data_windows(df, country, '', [window], category, index)[0]
+                 for country in COUNTRIES for category in CATEGORIES for window in (earlier, later)]
+    for prorate in [False, True]:
+        before = timed(lambda: [row_wise_per_day_mean(c, earlier, prorate) for c in campaigns], repeat=1)
+        after = timed(batch_estimates, df, earlier, later, 10, per_day=True, prorate=prorate)
+        print(f"  prorate={prorate!s:<5}  row-wise means {before:6.2f} s   batch {after:6.2f} s")
+
+if __name__ == '__main__':
+    bench_excel_readers()
+    bench_demand_parsing()
+    bench_filter_rerun()
+    bench_batch_estimation()
+    bench_growth_sweep()
+    bench_selection_toggles()
+    bench_bootstrap()
+    bench_per_day_estimation()
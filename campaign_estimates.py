@@ -0,0 +1,35 @@
+import numpy as np
+import streamlit as st
+
+from campaign_selection import selected_values, selection_stats
+from estimation import (BOOTSTRAP_CONFIDENCE, BOOTSTRAP_REPLICATES, GROWTH_SWEEP, bootstrap_estimate, demand_basis,
+                        growth_curve)
+
+
+def growth_scenarios(earlier, later, target_growth, unit):
+    # the period means are taken once; the whole range of growth values is then a single NumPy expression
+    low, high = st.slider("Growth range (%)", -100, 1000, GROWTH_SWEEP, key='growth_range')
+    curve = growth_curve(*selection_stats(earlier), *selection_stats(later), low, high)
+    st.line_chart(curve, x_label="Growth from Earlier Period (%)", y_label=f"Estimated demand ({unit})")
+    st.caption(f"Current target {target_growth}% · range {curve['estimate'].min():,.2f} to {curve['estimate'].max():,.2f} {unit}")
+
+
+def uncertainty(earlier, later, target_growth, unit):
+    replicates_col, confidence_col, seed_col = st.columns(3)
+    replicates = replicates_col.number_input("Bootstrap replicates", min_value=100, max_value=100_000,
+                                             value=BOOTSTRAP_REPLICATES, step=500, key='bootstrap_replicates')
+    confidence = confidence_col.slider("Confidence (%)", 50, 99, int(BOOTSTRAP_CONFIDENCE * 100), key='bootstrap_confidence')
+    seed = seed_col.number_input("Seed", min_value=0, value=0, step=1, key='bootstrap_seed')
+    (earlier_values, earlier_weights), (later_values, later_weights) = selected_values(earlier), selected_values(later)
+    interval = bootstrap_estimate(earlier_values, later_values, target_growth, int(replicates), confidence / 100, int(seed),
+                                  earlier_weights, later_weights)
+    if np.isnan(interval.low):
+        st.info("Not enough campaigns with a Demand value to bootstrap an interval.")
+    else:
+        st.write(f"{confidence}% bootstrap interval: {interval.low:,.2f} to {interval.high:,.2f} {unit}")
+
+
+def period_basis(filtered, window, start_col, end_col, per_day, prorate):
+    # the selection rebuilds its running totals only when this name changes
+    name = ('per_day', prorate, tuple(window)) if per_day else 'demand'
+    return name, lambda: demand_basis(filtered['Demand'], filtered[start_col], filtered[end_col], window, per_day, prorate)
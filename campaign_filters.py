@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from campaign_frame import search_key, drop_search_keys
+from campaign_index import (partition_positions, partition_intervals, query_date_intervals,
+                            date_window_mask, trigram_candidates)
+
+
+def search_mask(df, pattern):
+    name_key, desc_key = search_key('Name'), search_key('Description')
+    name_mask = df[name_key].str.contains(pattern, na=False, regex=False) if name_key in df.columns else pd.Series(False, index=df.index)
+    desc_mask = df[desc_key].str.contains(pattern, na=False, regex=False) if desc_key in df.columns else pd.Series(False, index=df.index)
+    return (name_mask | desc_mask).to_numpy(dtype=bool)
+
+
+def search_pattern(search_filter):
+    """The casefolded text to search for, or None when the filter is shorter than 3 characters."""
+    if search_filter and len(search_filter.strip()) >= 3:
+        return search_filter.strip().replace('\u00A0', '').replace('\u202F', '').casefold()
+    return None
+
+
+def filter_data_windows(df, country, search_filter, windows, selected_category=None, partition_index=None,
+                        date_match='overlap', trigram_index=None):
+    """Apply the country, category and search filters once, then return one slice per (start, end) window.
+
+    Slices are positional takes of the shown columns (the __key shadows are
+    left out); nothing in df is modified. A trigram_index, when given, narrows
+    the rows the search has to scan.
+    """
+    if 'Country' not in df.columns:
+        return [pd.DataFrame() for _ in windows]
+
+    has_dates = 'Start' in df.columns and 'End' in df.columns
+    pattern = search_pattern(search_filter)
+    # Name/Description/Category were cleaned at load; match against their casefolded __key shadows
+    category_key = search_key('Category')
+
+    # only the shown columns are ever gathered; under copy-on-write this selection itself copies nothing
+    visible = drop_search_keys(df)
+
+    if partition_index is None:
+        base = df[df['Country'] == country]
+        if selected_category and selected_category != "All" and category_key in base.columns:
+            base = base[base[category_key] == selected_category.strip().casefold()]
+        if pattern:
+            base = base[search_mask(base, pattern)]
+        base = drop_search_keys(base)
+        if not has_dates:
+            return [base for _ in windows]
+        return [base[date_window_mask(base['Start'], base['End'], start, end, how=date_match)] for start, end in windows]
+
+    category = selected_category if category_key in df.columns else None
+    positions = partition_positions(partition_index, country, category)
+    if pattern:
+        if trigram_index is not None:
+            candidates = trigram_candidates(trigram_index, pattern)
+            if candidates is not None:
+                positions = positions[np.isin(positions, candidates, assume_unique=True)]
+        # the trigram index only yields candidates; confirm the exact substring once for all windows
+        keys = df[[c for c in (search_key('Name'), search_key('Description')) if c in df.columns]]
+        positions = positions[search_mask(keys.take(positions), pattern)]
+    if not has_dates:
+        return [visible.take(positions) for _ in windows]
+
+    # Start/End were converted to datetime64 by parse_date_columns at load
+    intervals = partition_intervals(partition_index, df, country, category)
+    slices = []
+    for start, end in windows:
+        window_positions = query_date_intervals(intervals, start, end, how=date_match)
+        if pattern:
+            window_positions = window_positions[np.isin(window_positions, positions, assume_unique=True)]
+        slices.append(visible.take(window_positions))
+    return slices
+
+
+def filter_data(df, country, search_filter, start_date, end_date, selected_category=None, partition_index=None,
+                date_match='overlap', trigram_index=None):
+    return filter_data_windows(df, country, search_filter, [(start_date, end_date)], selected_category, partition_index,
+                               date_match, trigram_index)[0]
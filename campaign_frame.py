@@ -0,0 +1,109 @@
+import pandas as pd
+
+DATE_SAMPLE_SIZE = 500
+# tried in order on a sample of the text dates; day-first layouts go before ISO ones
+DATE_FORMATS = [
+    '%d.%m.%Y', '%d.%m.%Y %H:%M:%S', '%d.%m.%Y %H:%M', '%d.%m.%y',
+    '%d/%m/%Y', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%y',
+    '%d-%m-%Y', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S',
+]
+
+
+def enable_copy_on_write():
+    # always on from pandas 3, where setting the option only raises a deprecation warning
+    if int(pd.__version__.split('.')[0]) < 3:
+        pd.set_option('mode.copy_on_write', True)
+
+
+def infer_date_format(text, sample_size=DATE_SAMPLE_SIZE):
+    """Return the DATE_FORMATS entry that parses most of a sample of text dates, or None."""
+    sample = text.head(sample_size)
+    best, best_hits = None, 0
+    for fmt in DATE_FORMATS:
+        hits = int(pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum())
+        if hits > best_hits:
+            best, best_hits = fmt, hits
+            if hits == len(sample):
+                break
+    return best
+
+
+def parse_date_column(series):
+    """Convert a Start/End column to datetime64[ns] once, at load time.
+
+    Date and datetime objects convert directly. Text is parsed with the
+    format inferred from a sample; only the values that do not match it fall
+    back to ISO 8601 and then pandas' day-first guessing. Anything unparseable
+    becomes NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype('datetime64[ns]')
+
+    result = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]', name=series.name)
+    na = series.isna().to_numpy()
+    is_text = series.map(type).isin([str]).to_numpy() & ~na
+    others = ~na & ~is_text
+    if others.any():
+        result[others] = pd.to_datetime(series[others], errors='coerce', format='mixed').astype('datetime64[ns]')
+    if is_text.any():
+        text = series[is_text].astype(str).str.strip()
+        fmt = infer_date_format(text)
+        parsed = pd.to_datetime(text, format=fmt, errors='coerce') if fmt else pd.Series(pd.NaT, index=text.index)
+        for fallback in [{'format': 'ISO8601'}, {'format': 'mixed', 'dayfirst': True}]:
+            # ISO goes first because dateutil would read 2024-03-01 day-first as 3 January
+            outliers = parsed.isna().to_numpy() & (text != '').to_numpy()
+            if not outliers.any():
+                break
+            parsed[outliers] = pd.to_datetime(text[outliers], errors='coerce', **fallback)
+        result[is_text] = parsed.astype('datetime64[ns]')
+    return result
+
+
+def parse_date_columns(df, columns):
+    for col in columns:
+        if col in df.columns:
+            df[col] = parse_date_column(df[col])
+    return df
+
+
+TEXT_COLUMNS = ['Name', 'Description', 'Category']
+SEARCH_KEY_SUFFIX = '__key'
+
+
+def search_key(col):
+    return col + SEARCH_KEY_SUFFIX
+
+
+def normalize_text_columns(df, columns=TEXT_COLUMNS):
+    """Strip and drop NBSP/NNBSP from text columns once, adding casefolded `<col>__key` shadows for matching."""
+    for col in columns:
+        if col in df.columns:
+            # astype(str) turns missing values into 'nan'/'None' on pandas 2, so put them back
+            cleaned = df[col].astype(str).str.strip().str.replace('[\u00A0\u202F]', '', regex=True)
+            cleaned = cleaned.where(df[col].notna())
+            df[col] = cleaned
+            df[search_key(col)] = cleaned.str.casefold()
+    return df
+
+
+def drop_search_keys(df):
+    keys = [c for c in df.columns if str(c).endswith(SEARCH_KEY_SUFFIX)]
+    return df.drop(columns=keys) if keys else df
+
+
+CATEGORICAL_COLUMNS = ['Country', 'Category', search_key('Category')]
+
+
+def encode_categoricals(df, columns=CATEGORICAL_COLUMNS):
+    """Store low-cardinality columns as Categorical so == filters compare integer codes."""
+    for col in columns:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = pd.Categorical(df[col])
+    return df
+
+
+def category_options(series):
+    """Sorted distinct non-null values, read from the categories when the column is Categorical."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.categories.tolist()
+    return sorted(series.dropna().unique().tolist())
@@ -0,0 +1,186 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+EMPTY_POSITIONS = np.array([], dtype=np.intp)
+NAT_NS = np.iinfo('int64').min
+
+
+def category_match_key(value):
+    return str(value).strip().casefold()
+
+
+def build_partition_index(df, country_col='Country', category_col='Category'):
+    """Map each country, and each (country, casefolded category) pair, to its sorted row positions.
+
+    Built once per loaded file so that picking a slice is a positional take
+    instead of a boolean scan over the whole frame.
+    """
+    index = {}
+    if country_col not in df.columns:
+        return index
+    index['country'] = df.groupby(country_col, observed=True, sort=False).indices
+    if category_col in df.columns:
+        category_key = df[category_col].astype(str).str.strip().str.casefold()
+        index['country_category'] = df.groupby([df[country_col], category_key], observed=True, sort=False).indices
+    return index
+
+
+def partition_positions(index, country, category=None):
+    if category is None or category == "All":
+        return index.get('country', {}).get(country, EMPTY_POSITIONS)
+    return index.get('country_category', {}).get((country, category_match_key(category)), EMPTY_POSITIONS)
+
+
+DATE_MATCH_MODES = ('overlap', 'contained')
+
+# A campaign's dates, restricted to rows with both Start and End, sorted by Start.
+# max_duration bounds how far before a window an overlapping campaign can start.
+DateIntervals = namedtuple('DateIntervals', ['starts', 'ends', 'positions', 'max_duration'])
+
+
+def _as_ns(values):
+    return np.asarray(values, dtype='datetime64[ns]').view('int64')
+
+
+def _window_ns(start_date, end_date):
+    return pd.Timestamp(start_date).as_unit('ns').value, pd.Timestamp(end_date).as_unit('ns').value
+
+
+def build_date_intervals(df, positions, start_col='Start', end_col='End'):
+    starts = _as_ns(df[start_col].to_numpy()[positions])
+    ends = _as_ns(df[end_col].to_numpy()[positions])
+    valid = (starts != NAT_NS) & (ends != NAT_NS)
+    starts, ends, positions = starts[valid], ends[valid], np.asarray(positions)[valid]
+    order = np.argsort(starts, kind='stable')
+    max_duration = int((ends - starts).max()) if len(starts) else 0
+    return DateIntervals(starts[order], ends[order], positions[order], max(max_duration, 0))
+
+
+def query_date_intervals(intervals, start_date, end_date, how='overlap'):
+    """Row positions (ascending) whose [Start, End] overlaps, or lies within, [start_date, end_date].
+
+    Two binary searches on the sorted starts bound the candidates, so a query
+    costs O(log N + k) for campaigns no longer than max_duration.
+    """
+    window_start, window_end = _window_ns(start_date, end_date)
+    starts, ends = intervals.starts, intervals.ends
+    if how == 'overlap':
+        lo = np.searchsorted(starts, window_start - intervals.max_duration, side='left')
+        hi = np.searchsorted(starts, window_end, side='right')
+        hit = ends[lo:hi] >= window_start
+    elif how == 'contained':
+        lo = np.searchsorted(starts, window_start, side='left')
+        hi = np.searchsorted(starts, window_end, side='right')
+        hit = ends[lo:hi] <= window_end
+    else:
+        raise ValueError(f"Unknown date match '{how}'; expected one of {DATE_MATCH_MODES}")
+    return np.sort(intervals.positions[lo:hi][hit])
+
+
+def date_window_mask(starts, ends, start_date, end_date, how='overlap'):
+    """Boolean-mask version of query_date_intervals for frames without an index."""
+    start_ts, end_ts = pd.to_datetime(start_date), pd.to_datetime(end_date)
+    if how == 'overlap':
+        return (ends >= start_ts) & (starts <= end_ts)
+    if how == 'contained':
+        return (starts >= start_ts) & (ends <= end_ts)
+    raise ValueError(f"Unknown date match '{how}'; expected one of {DATE_MATCH_MODES}")
+
+
+def partition_intervals(index, df, country, category=None, start_col='Start', end_col='End'):
+    """DateIntervals for one country/category slice, built on first use and kept in the index."""
+    key = (country, None if category is None or category == "All" else category_match_key(category))
+    cache = index.setdefault('intervals', {})
+    if key not in cache:
+        cache[key] = build_date_intervals(df, partition_positions(index, country, category), start_col, end_col)
+    return cache[key]
+
+
+# Trigram inverted index over casefolded search text. Posting lists are stored CSR-style:
+# rows[offsets[i]:offsets[i + 1]] are the ascending row positions containing trigram codes[i].
+TrigramIndex = namedtuple('TrigramIndex', ['codes', 'offsets', 'rows'])
+TRIGRAM_SEPARATOR = '\x00'
+TRIGRAM_BLOCK_ROWS = 20_000
+
+
+def _trigram_codes(codepoints):
+    # three 21-bit code points packed into one uint64
+    c = codepoints.astype(np.uint64)
+    return (c[:-2] << np.uint64(42)) | (c[1:-1] << np.uint64(21)) | c[2:]
+
+
+def _trigram_postings(texts, first_row, row_dtype):
+    """Distinct (code, row) pairs of one block of separator-terminated texts, sorted by code then row."""
+    codepoints = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32)
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    row_of_char = np.repeat(np.arange(first_row, first_row + len(texts), dtype=row_dtype), lengths)
+
+    codes = _trigram_codes(codepoints)
+    sep = codepoints == ord(TRIGRAM_SEPARATOR)
+    valid = ~(sep[:-2] | sep[1:-1] | sep[2:])
+    codes, rows = codes[valid], row_of_char[:-2][valid]
+
+    order = np.argsort(codes, kind='stable')
+    codes, rows = codes[order], rows[order]
+    keep = np.ones(len(codes), dtype=bool)
+    keep[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+    return codes[keep], rows[keep]
+
+
+def build_trigram_index(df, columns, block_rows=TRIGRAM_BLOCK_ROWS):
+    """Index every 3-character substring of the given (already casefolded) text columns.
+
+    Columns are joined per row with a separator that no trigram may span, so
+    the index yields candidates for a substring of any single column. Rows are
+    indexed in blocks to bound the memory the build needs.
+    """
+    texts = None
+    for col in columns:
+        if col in df.columns:
+            part = df[col].astype(object).where(df[col].notna(), '').astype(str)
+            texts = part if texts is None else texts + TRIGRAM_SEPARATOR + part
+    row_dtype = np.int32 if len(df) <= np.iinfo(np.int32).max else np.int64
+    if texts is None or texts.empty:
+        return TrigramIndex(np.array([], dtype=np.uint64), np.zeros(1, dtype=np.int64), np.array([], dtype=row_dtype))
+
+    texts = texts + TRIGRAM_SEPARATOR
+    blocks = [_trigram_postings(texts.iloc[i:i + block_rows].tolist(), i, row_dtype)
+              for i in range(0, len(texts), block_rows)]
+    codes = np.concatenate([codes for codes, _ in blocks])
+    rows = np.concatenate([rows for _, rows in blocks])
+    del blocks
+    # blocks cover ascending rows, so a stable sort keeps each posting list ascending
+    rows = rows[np.argsort(codes, kind='stable')]
+    codes.sort()
+
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], dtype=np.int64)
+    offsets = np.append(starts, len(codes))
+    return TrigramIndex(codes[starts], offsets, rows)
+
+
+def trigram_index_nbytes(trigram_index):
+    return sum(a.nbytes for a in trigram_index)
+
+
+def trigram_candidates(trigram_index, pattern):
+    """Ascending row positions that contain every trigram of pattern (a superset of the real matches)."""
+    if len(pattern) < 3:
+        return None
+    wanted = np.unique(_trigram_codes(np.frombuffer(pattern.encode('utf-32-le'), dtype=np.uint32)))
+    slots = np.searchsorted(trigram_index.codes, wanted)
+    postings = []
+    for code, slot in zip(wanted, slots):
+        if slot >= len(trigram_index.codes) or trigram_index.codes[slot] != code:
+            return EMPTY_POSITIONS
+        postings.append(trigram_index.rows[trigram_index.offsets[slot]:trigram_index.offsets[slot + 1]])
+    postings.sort(key=len)
+    result = postings[0]
+    for rows in postings[1:]:
+        if not len(result):
+            break
+        # probe the shortest surviving list into the next one: O(k log n) instead of a merge sort
+        slot = np.minimum(np.searchsorted(rows, result), len(rows) - 1)
+        result = result[rows[slot] == result]
+    return result
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from campaign_tables import table_controls
+from session_memo import session_memo
+
+INCLUDE_COL = 'Include'
+
+
+def slice_fingerprint(df):
+    # index labels alone repeat across uploads, so the values a basis is computed from are hashed too
+    basis_cols = [c for c in df.columns if c == 'Demand' or pd.api.types.is_datetime64_any_dtype(df[c])]
+    return int(pd.util.hash_pandas_object(df[basis_cols], index=True).sum())
+
+
+def new_selection(values, weights=None):
+    """Selection state for one period with every row included.
+
+    Besides the include flags it keeps running totals (rows, weight and
+    weighted sum of the per-row values), so the period mean never has to be
+    recomputed from the frame. Without weights every value counts once.
+    """
+    selection = {'include': np.ones(len(values), dtype=bool)}
+    set_basis(selection, values, weights)
+    return selection
+
+
+def set_basis(selection, values, weights=None):
+    """Swap the per-row values/weights a selection averages (e.g. Demand for Demand per day), keeping its flags."""
+    values = pd.Series(values).to_numpy(dtype='float64', na_value=np.nan)
+    weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype='float64')
+    valid = ~np.isnan(values) & (weights > 0)
+    selection['weights'] = np.where(valid, weights, 0.0)
+    selection['weighted'] = np.where(valid, values * selection['weights'], 0.0)
+    include = selection['include']
+    selection['rows'] = int(include.sum())
+    selection['weight'] = float(selection['weights'][include].sum())
+    selection['sum'] = float(selection['weighted'][include].sum())
+
+
+def set_included(selection, positions, value):
+    """Include or exclude rows, given as positions or a boolean mask.
+
+    Only rows whose flag actually changes touch the totals, so a single toggle is O(1).
+    """
+    positions = np.asarray(positions)
+    if positions.dtype == bool:
+        positions = np.flatnonzero(positions)
+    changed = positions[selection['include'][positions] != value]
+    if not len(changed):
+        return
+    sign = 1 if value else -1
+    selection['include'][changed] = value
+    selection['rows'] += sign * len(changed)
+    selection['weight'] += sign * float(selection['weights'][changed].sum())
+    selection['sum'] += sign * float(selection['weighted'][changed].sum())
+
+
+def selection_stats(selection):
+    """(mean value, included rows) of a selection; a missing selection counts as empty."""
+    if selection is None or selection['weight'] <= 0:
+        return np.nan, 0 if selection is None else selection['rows']
+    return selection['sum'] / selection['weight'], selection['rows']
+
+
+def selected_values(selection):
+    """(values, weights) of the included rows; values are NaN where a row has no usable value."""
+    if selection is None:
+        return np.array([], dtype='float64'), np.array([], dtype='float64')
+    include, weights = selection['include'], selection['weights']
+    values = np.divide(selection['weighted'], weights, out=np.full(len(weights), np.nan), where=weights > 0)
+    return values[include], weights[include]
+
+
+def selected_frame(df, selection):
+    return df[selection['include']] if selection is not None else df.iloc[:0]
+
+
+def selection_state(key, df, basis=None):
+    """The selection for df, kept in session state until the slice itself changes.
+
+    basis is a (name, compute) pair; when its name differs from the stored
+    one, compute() gives the new (values, weights) and the totals are rebuilt
+    once. By default the selection averages raw Demand.
+    """
+    name, compute = basis if basis is not None else ('demand', lambda: (df['Demand'], None))
+    selection = session_memo(f"{key}_include", slice_fingerprint(df), lambda: new_selection(*compute()))
+    if selection.get('basis', name) != name:
+        set_basis(selection, *compute())
+    selection['basis'] = name
+    return selection
+
+
+def _apply_edits(editor_key, selection, positions):
+    for row, changes in st.session_state[editor_key].get('edited_rows', {}).items():
+        if INCLUDE_COL in changes:
+            set_included(selection, positions[[int(row)]], bool(changes[INCLUDE_COL]))
+
+
+def selection_editor(df, key, columns=None, basis=None):
+    """Render one page of df in a data_editor with an Include checkbox column and return its selection.
+
+    Every row starts included. Edits are copied into the selection as they
+    happen, so they survive paging and sorting.
+    """
+    columns = list(df.columns) if columns is None else [c for c in columns if c in df.columns]
+    selection = selection_state(key, df, basis)
+    all_col, none_col = st.columns(2)
+    all_col.button("Select all", key=f"{key}_select_all", on_click=set_included,
+                   args=(selection, np.arange(len(df)), True))
+    none_col.button("Deselect all", key=f"{key}_deselect_all", on_click=set_included,
+                    args=(selection, np.arange(len(df)), False))
+    positions = table_controls(df[columns], key)
+    # a new editor per page, so edits made on one page are never overlaid on another;
+    # the include state goes into the key too, so bulk changes redraw the page
+    editor_key = f"{key}_editor_{hash(positions.tobytes())}_{selection['rows']}"
+    st.data_editor(
+        df[columns].take(positions).assign(**{INCLUDE_COL: selection['include'][positions]}),
+        key=editor_key,
+        hide_index=True,
+        column_order=[INCLUDE_COL] + columns,
+        column_config={INCLUDE_COL: st.column_config.CheckboxColumn(INCLUDE_COL, default=True)},
+        disabled=columns,
+        on_change=_apply_edits,
+        args=(editor_key, selection, positions),
+    )
+    st.caption(f"{selection['rows']:,} of {len(df):,} campaigns included.")
+    return selection
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import streamlit as st
+
+PAGE_SIZES = [25, 50, 100, 250, 500]
+DEFAULT_PAGE_SIZE = int(os.environ.get('CAMPAIGN_TABLE_PAGE_SIZE', '50'))
+
+
+def sorted_positions(df, column=None, descending=False):
+    """Row positions of df in display order; missing values always sort last."""
+    if column is None or column not in df.columns:
+        return np.arange(len(df))
+    values = df[column].reset_index(drop=True)
+    return values.sort_values(ascending=not descending, kind='stable', na_position='last').index.to_numpy()
+
+
+def page_bounds(n_rows, page, page_size):
+    """Clamp page to the available pages and return (start, stop, n_pages)."""
+    n_pages = max(1, -(-n_rows // page_size))
+    page = min(max(int(page), 1), n_pages)
+    start = (page - 1) * page_size
+    return start, min(start + page_size, n_rows), n_pages
+
+
+def table_controls(df, key):
+    """Sort and paging widgets for df; returns the row positions of the visible page.
+
+    Only these positions need to be taken and sent to the browser; the row
+    count comes from len(df).
+    """
+    page_sizes = sorted(set(PAGE_SIZES + [DEFAULT_PAGE_SIZE]))
+    sort_col, desc_col, size_col, page_col = st.columns([3, 1, 1, 1])
+    column = sort_col.selectbox("Sort by", [None] + list(df.columns), key=f"{key}_sort",
+                                format_func=lambda c: "(file order)" if c is None else str(c))
+    descending = desc_col.checkbox("Descending", key=f"{key}_desc")
+    page_size = size_col.selectbox("Rows per page", page_sizes, index=page_sizes.index(DEFAULT_PAGE_SIZE),
+                                   key=f"{key}_size")
+    page = page_col.number_input("Page", min_value=1, step=1, key=f"{key}_page")
+
+    start, stop, n_pages = page_bounds(len(df), page, page_size)
+    if stop > start:
+        st.caption(f"Rows {start + 1:,}–{stop:,} of {len(df):,} (page {start // page_size + 1} of {n_pages})")
+    else:
+        st.caption("No rows.")
+    if column is None:
+        return np.arange(start, stop)
+    return sorted_positions(df, column, descending)[start:stop]
+
+
+@st.fragment
+def paged_table(df, key):
+    # a fragment, so paging or sorting reruns only this table
+    positions = table_controls(df, key)
+    st.dataframe(df.take(positions), hide_index=True)
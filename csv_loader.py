@@ -0,0 +1,110 @@
+import csv
+import io
+import re
+
+import chardet
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+ENCODING_SAMPLE_BYTES = 64 * 1024
+SNIFF_SAMPLE_BYTES = 8 * 1024
+CANDIDATE_DELIMITERS = ';\t,'
+DEFAULT_DELIMITER = ';'
+CHUNK_BYTES = 4 * 1024 * 1024
+# used when the detected encoding cannot decode the whole file
+FALLBACK_ENCODING = 'cp1252'
+NON_ASCII = re.compile(rb'[\x80-\xff]')
+DECODE_ERRORS = (UnicodeDecodeError,) + ((pa.ArrowInvalid,) if pa is not None else ())
+
+
+def detect_encoding(raw):
+    sample = raw[:ENCODING_SAMPLE_BYTES]
+    if sample.isascii():
+        # an ascii head says nothing about the rest, so sample from the first non-ascii byte instead
+        match = NON_ASCII.search(raw, len(sample))
+        if match is None:
+            return 'utf-8'
+        start = raw.rfind(b'\n', 0, match.start()) + 1
+        sample = raw[start:start + ENCODING_SAMPLE_BYTES]
+    encoding = chardet.detect(sample)['encoding']
+    # utf-8 is a superset of ascii
+    if encoding is None or encoding.lower() == 'ascii':
+        return 'utf-8'
+    return encoding
+
+
+def sniff_dialect(raw, encoding):
+    sample = raw[:SNIFF_SAMPLE_BYTES].decode(encoding, errors='ignore')
+    lines = sample.splitlines()
+    if len(lines) > 1 and not sample.endswith(('\n', '\r')):
+        # drop the partial last line so it does not skew the sniffer
+        sample = '\n'.join(lines[:-1])
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=CANDIDATE_DELIMITERS)
+        delimiter, quotechar = dialect.delimiter, dialect.quotechar or '"'
+    except csv.Error:
+        delimiter, quotechar = DEFAULT_DELIMITER, '"'
+    header = next(csv.reader(io.StringIO(sample), delimiter=delimiter, quotechar=quotechar), [])
+    return delimiter, quotechar, header
+
+
+def _infer_numeric(df):
+    for col in df.columns:
+        if df[col].dtype == object or pd.api.types.is_string_dtype(df[col]):
+            try:
+                df[col] = pd.to_numeric(df[col])
+            except (ValueError, TypeError):
+                pass
+    return df
+
+
+def _read_pyarrow(raw, encoding, delimiter, quotechar, header):
+    read_options = pa_csv.ReadOptions(encoding=encoding, block_size=CHUNK_BYTES)
+    parse_options = pa_csv.ParseOptions(delimiter=delimiter, quote_char=quotechar)
+    # read everything as text so later blocks can never contradict types guessed from the first
+    convert_options = pa_csv.ConvertOptions(column_types={name: pa.string() for name in header},
+                                            strings_can_be_null=True)
+    reader = pa_csv.open_csv(pa.BufferReader(raw), read_options=read_options,
+                             parse_options=parse_options, convert_options=convert_options)
+    df = reader.read_all().to_pandas()
+    return _infer_numeric(df)
+
+
+def _read_pandas(raw, encoding, delimiter, quotechar):
+    chunks = pd.read_csv(io.BytesIO(raw), encoding=encoding, sep=delimiter, quotechar=quotechar,
+                         chunksize=200_000, low_memory=False)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _read(raw, encoding, delimiter, quotechar, header):
+    if pa is not None:
+        return _read_pyarrow(raw, encoding, delimiter, quotechar, header)
+    return _read_pandas(raw, encoding, delimiter, quotechar)
+
+
+def read_campaign_csv(raw):
+    """Parse raw CSV bytes in a single pass.
+
+    Encoding comes from a bounded chardet sample (falling back to cp1252 if
+    it cannot decode the file) and the delimiter from csv.Sniffer on the
+    first kilobytes; pyarrow's block reader is used when installed,
+    otherwise pandas in chunks.
+    """
+    encoding = detect_encoding(raw)
+    delimiter, quotechar, header = sniff_dialect(raw, encoding)
+    try:
+        df = _read(raw, encoding, delimiter, quotechar, header)
+    except DECODE_ERRORS:
+        # the sample can still guess wrong; re-read with a single-byte codec rather than fail
+        if encoding == FALLBACK_ENCODING:
+            raise
+        encoding = FALLBACK_ENCODING
+        df = _read(raw, encoding, delimiter, quotechar, header)
+    df.attrs['csv_delimiter'] = delimiter
+    df.attrs['csv_encoding'] = encoding
+    return df
@@ -0,0 +1,116 @@
+import numbers
+import unicodedata
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+DEMAND_MAX_ABS = 1e12
+NUMBER_PATTERN = r'-?(?:\d+\.?\d*|\.\d+)'
+FORMAT_SAMPLE_SIZE = 2000
+# campaign exports are European, so files with only ambiguous values like '1.234' default to ',' decimals
+DEFAULT_DECIMAL = ','
+
+NumberFormat = namedtuple('NumberFormat', ['decimal', 'currency'])
+
+
+def _is_real_number_type(t):
+    # python, NumPy and Decimal numbers; bools and complex values are not Demand figures
+    return (issubclass(t, (numbers.Number, np.number))
+            and not issubclass(t, (bool, np.bool_, complex, np.complexfloating)))
+
+
+def _numeric_type_mask(series):
+    types = series.map(type)
+    numeric = [t for t in types.unique() if _is_real_number_type(t)]
+    return types.isin(numeric).to_numpy()
+
+
+def _is_currency(token):
+    return all(unicodedata.category(c) == 'Sc' for c in token) or (token.isalpha() and len(token) >= 2)
+
+
+def _split_values(series):
+    """Return (numeric_mask, text_mask) for a Demand column of any dtype."""
+    none = np.zeros(len(series), dtype=bool)
+    na = series.isna().to_numpy()
+    if pd.api.types.is_bool_dtype(series):
+        return none, none
+    if pd.api.types.is_numeric_dtype(series):
+        return ~na, none
+    if pd.api.types.is_string_dtype(series) and series.dtype != object:
+        return none, ~na
+    # anything else that is not missing goes through its text form, as str(val) did before
+    numeric = _numeric_type_mask(series) & ~na
+    return numeric, ~numeric & ~na
+
+
+def infer_number_format(series, sample_size=FORMAT_SAMPLE_SIZE):
+    """Work out the decimal separator and currency of a Demand column.
+
+    Only a sample of the text values is inspected. A value votes for a decimal
+    separator when both '.' and ',' appear (the last one wins), when one of them
+    repeats (so the other is the decimal) or when a single separator is not
+    followed by exactly three digits.
+    """
+    series = pd.Series(series)
+    _, text_mask = _split_values(series)
+    return _infer_from_text(series[text_mask], sample_size)
+
+
+def _infer_from_text(text, sample_size=FORMAT_SAMPLE_SIZE):
+    text = text.astype(str)
+    if len(text) > sample_size:
+        text = text.sample(sample_size, random_state=0)
+
+    seps = text.str.replace(r'[^0-9.,]', '', regex=True)
+    dots = seps.str.count(r'\.')
+    commas = seps.str.count(',')
+    last = seps.str.extract(r'([.,])\d*$')[0]
+    decisive = ((dots > 0) & (commas > 0)) | (((dots + commas) == 1) & ~seps.str.contains(r'[.,]\d{3}$'))
+    dot_votes = int((decisive & (last == '.')).sum() + ((commas > 1) & (dots == 0)).sum())
+    comma_votes = int((decisive & (last == ',')).sum() + ((dots > 1) & (commas == 0)).sum())
+    if dot_votes > comma_votes:
+        decimal = '.'
+    elif comma_votes > dot_votes:
+        decimal = ','
+    else:
+        decimal = DEFAULT_DECIMAL
+
+    # a currency is a symbol or a word next to a number, so '1e3' or 'n/a' do not count
+    tokens = text[text.str.contains(r'\d')].str.extract(r'([^\d\s.,\-]+)')[0].dropna()
+    tokens = tokens[tokens.map(_is_currency)]
+    currency = tokens.mode().iloc[0] if not tokens.empty else None
+    return NumberFormat(decimal, currency)
+
+
+def parse_demand_series(series, number_format=None):
+    """Vectorised Demand parser: whole column in, float64 column out.
+
+    Numbers pass through unchanged. Text is converted with one number_format
+    (inferred from the column when not given): everything except digits, '-'
+    and the decimal separator is dropped, so thousands separators and currency
+    tokens disappear. Unparseable values and values beyond DEMAND_MAX_ABS
+    become NaN. The format used is left in the result's attrs['number_format'].
+    """
+    series = pd.Series(series)
+    numeric, text_mask = _split_values(series)
+    if number_format is None:
+        number_format = _infer_from_text(series[text_mask])
+
+    result = np.full(len(series), np.nan)
+    if numeric.any():
+        result[numeric] = series[numeric].astype('float64').to_numpy()
+    if text_mask.any():
+        decimal = number_format.decimal
+        text = series[text_mask].astype(str).str.replace('[^0-9\\-' + decimal + ']', '', regex=True)
+        if decimal != '.':
+            text = text.str.replace(decimal, '.', regex=False)
+        values = np.full(len(text), np.nan)
+        valid = text.str.fullmatch(NUMBER_PATTERN).to_numpy(dtype=bool)
+        values[valid] = text[valid].astype('float64').to_numpy()
+        values[np.abs(values) > DEMAND_MAX_ABS] = np.nan
+        result[text_mask] = values
+    parsed = pd.Series(result, index=series.index, name=series.name)
+    parsed.attrs['number_format'] = number_format
+    return parsed
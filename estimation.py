@@ -0,0 +1,306 @@
+"""Demand estimates for every country/category pair at once. Run with `python estimation.py --help`."""
+import argparse
+from collections import namedtuple
+from datetime import date, datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from campaign_frame import encode_categoricals, normalize_text_columns, parse_date_columns
+from campaign_index import category_match_key, date_window_mask
+from demand_parsing import parse_demand_series
+
+PERIODS = ('earlier', 'later')
+GROWTH_SWEEP = (-50, 200)
+BOOTSTRAP_REPLICATES = 2000
+BOOTSTRAP_CONFIDENCE = 0.95
+# resampling index matrices are generated in blocks of at most this many cells
+BOOTSTRAP_BLOCK_CELLS = 4_000_000
+
+BootstrapInterval = namedtuple('BootstrapInterval', ['estimate', 'low', 'high'])
+
+
+def combine_estimates(earlier_mean, earlier_rows, later_mean, later_rows, percentage):
+    """The apps' estimate rule on arrays: the growth-adjusted earlier mean, the later mean, or their average.
+
+    Inputs broadcast against each other; pairs with no campaign in either period give NaN.
+    """
+    has_earlier = np.asarray(earlier_rows) > 0
+    has_later = np.asarray(later_rows) > 0
+    adjusted_earlier = np.asarray(earlier_mean, dtype='float64') * (1 + np.asarray(percentage) / 100)
+    later_mean = np.asarray(later_mean, dtype='float64')
+    return np.where(has_earlier & has_later, (adjusted_earlier + later_mean) / 2,
+                    np.where(has_earlier, adjusted_earlier, np.where(has_later, later_mean, np.nan)))
+
+
+def growth_curve(earlier_mean, earlier_rows, later_mean, later_rows, low=GROWTH_SWEEP[0], high=GROWTH_SWEEP[1], step=1):
+    """The estimate for every growth percentage from low to high, evaluated at once from the period means."""
+    growth = np.arange(low, high + step, step, dtype='float64')
+    estimate = combine_estimates(earlier_mean, earlier_rows, later_mean, later_rows, growth)
+    return pd.DataFrame({'estimate': estimate}, index=pd.Index(growth, name='growth_pct'))
+
+
+def campaign_days(starts, ends):
+    """Length of each campaign in days, counting both Start and End; NaN when a date is missing or reversed."""
+    days = (_as_datetimes(ends) - _as_datetimes(starts)) / np.timedelta64(1, 'D') + 1
+    return np.where(days > 0, days, np.nan)
+
+
+def _as_datetimes(values):
+    return np.asarray(values, dtype='datetime64[ns]')
+
+
+def demand_basis(demand, starts, ends, window=None, per_day=False, prorate=False):
+    """Per-campaign values and weights a period mean is taken over: sum(values * weights) / sum(weights).
+
+    By default each campaign's Demand counts once. per_day divides Demand by
+    the campaign's length in days. prorate (per_day only) then weights each
+    campaign by the days it overlaps window, so a campaign that only touches
+    the period counts for those days alone. Campaigns without a usable value
+    get weight 0.
+    """
+    values = np.asarray(demand, dtype='float64')
+    weights = np.ones(len(values))
+    if per_day:
+        values = values / campaign_days(starts, ends)
+        if prorate and window is not None:
+            window_start, window_end = (np.datetime64(pd.Timestamp(d).as_unit('ns')) for d in window)
+            overlap = (np.minimum(_as_datetimes(ends), window_end)
+                       - np.maximum(_as_datetimes(starts), window_start)) / np.timedelta64(1, 'D') + 1
+            weights = np.clip(overlap, 0, None)
+    valid = ~np.isnan(values) & (weights > 0)
+    return np.where(valid, values, np.nan), np.where(valid, weights, 0.0)
+
+
+def _pair_groups(df, country_col='Country', category_col='Category'):
+    """(labels, groups): every (country, category) pair in df and, per row, the position of its pair in labels.
+
+    Categories are matched case-insensitively, as the apps' category filter
+    does; each pair is labelled with the first spelling seen for it in df.
+    labels is sorted by country and matched category. Rows without a country
+    or category get -1.
+    """
+    countries, categories = df[country_col], df[category_col]
+    category_codes, spellings = pd.factorize(categories)
+    key_codes, keys = pd.factorize(pd.Index([category_match_key(s) for s in spellings]))
+    # the appended -1 keeps missing categories (code -1) missing, even when every category is missing
+    row_keys = np.append(key_codes, -1)[category_codes]
+    country_codes = pd.factorize(countries)[0]
+    rows = np.flatnonzero((country_codes >= 0) & (row_keys >= 0))
+    pair_codes = country_codes[rows] * len(keys) + row_keys[rows]
+    # first row of every pair: reversed fancy assignment leaves the earliest write in place
+    first = np.full((country_codes.max(initial=-1) + 1) * len(keys), -1, dtype='int64')
+    first[pair_codes[::-1]] = rows[::-1]
+    present = np.flatnonzero(first >= 0)
+    first_rows = first[present]
+    order = pd.DataFrame({'country': countries.iloc[first_rows].to_numpy(),
+                          'key': np.asarray(keys, dtype=object)[row_keys[first_rows]]}).sort_values(['country', 'key']).index
+    rank = np.full(len(first), -1, dtype='int64')
+    rank[present[order]] = np.arange(len(order))
+    groups = np.full(len(df), -1, dtype='int64')
+    groups[rows] = rank[pair_codes]
+    first_rows = first_rows[order]
+    labels = pd.MultiIndex.from_arrays([countries.iloc[first_rows], categories.iloc[first_rows].to_numpy()],
+                                       names=[country_col, category_col])
+    return labels, groups
+
+
+def period_aggregates(df, earlier_window, later_window, date_match='overlap', per_day=False, prorate=False,
+                      country_col='Country', category_col='Category', start_col='Start', end_col='End', demand_col='Demand'):
+    """Campaign count and weighted Demand sum per (country, category) and period, in one groupby.
+
+    Values and weights come from demand_basis; pairs and their labels come from _pair_groups.
+    """
+    demand = df[demand_col].to_numpy(dtype='float64', na_value=np.nan)
+    starts, ends = df[start_col].to_numpy(), df[end_col].to_numpy()
+    columns = {}
+    for period, window in zip(PERIODS, [earlier_window, later_window]):
+        in_window = date_window_mask(df[start_col], df[end_col], *window, how=date_match).to_numpy(dtype=bool)
+        values, weights = demand_basis(demand, starts, ends, window, per_day, prorate)
+        weights = np.where(in_window, weights, 0.0)
+        columns[f'{period}_rows'] = in_window.astype('int64')
+        columns[f'{period}_weight'] = weights
+        columns[f'{period}_sum'] = np.where(weights > 0, values * weights, 0.0)
+    labels, groups = _pair_groups(df, country_col, category_col)
+    sums = pd.DataFrame(columns)[groups >= 0].groupby(groups[groups >= 0]).sum()
+    sums.index = labels
+    return sums
+
+
+def batch_estimates(df, earlier_window, later_window, percentage, date_match='overlap', per_day=False, prorate=False,
+                    **columns):
+    """Estimate demand for every (country, category) pair in df, as one frame sorted by country and category.
+
+    columns overrides the column names used by period_aggregates.
+    """
+    agg = period_aggregates(df, earlier_window, later_window, date_match, per_day, prorate, **columns)
+    result = pd.DataFrame(index=agg.index)
+    for period in PERIODS:
+        weights = agg[f'{period}_weight'].to_numpy()
+        result[f'{period}_campaigns'] = agg[f'{period}_rows'].to_numpy()
+        result[f'{period}_mean'] = np.divide(agg[f'{period}_sum'].to_numpy(), weights,
+                                             out=np.full(len(weights), np.nan), where=weights > 0)
+    result['estimate'] = combine_estimates(result['earlier_mean'], result['earlier_campaigns'],
+                                           result['later_mean'], result['later_campaigns'], percentage)
+    return result.reset_index()
+
+
+def _bootstrap_means(values, weights, replicates, rng):
+    # one row of resampled indices per replicate
+    if not len(values):
+        return np.full(replicates, np.nan)
+    means = np.empty(replicates)
+    block = max(1, BOOTSTRAP_BLOCK_CELLS // len(values))
+    for start in range(0, replicates, block):
+        stop = min(start + block, replicates)
+        sample = rng.integers(0, len(values), (stop - start, len(values)))
+        if weights is None:
+            means[start:stop] = values[sample].mean(axis=1)
+        else:
+            means[start:stop] = (values * weights)[sample].sum(axis=1) / weights[sample].sum(axis=1)
+    return means
+
+
+def _usable(demand, weights):
+    demand = np.asarray(demand, dtype='float64')
+    valid = ~np.isnan(demand)
+    if weights is None:
+        return demand[valid], None
+    weights = np.asarray(weights, dtype='float64')
+    valid &= weights > 0
+    return demand[valid], weights[valid]
+
+
+def _weighted_mean(values, weights):
+    if not len(values):
+        return np.nan
+    return values.mean() if weights is None else (values * weights).sum() / weights.sum()
+
+
+def bootstrap_estimate(earlier_demand, later_demand, percentage, replicates=BOOTSTRAP_REPLICATES,
+                       confidence=BOOTSTRAP_CONFIDENCE, seed=None, earlier_weights=None, later_weights=None):
+    """Point estimate and bootstrap percentile interval for one selection.
+
+    Each period's Demand (NaN for campaigns without a value) is resampled with
+    replacement, the estimate rule is applied to every replicate at once, and
+    the interval is read from the replicate percentiles. Weights from
+    demand_basis turn the period means into weighted means.
+    """
+    rng = np.random.default_rng(seed)
+    earlier_values, earlier_weights = _usable(earlier_demand, earlier_weights)
+    later_values, later_weights = _usable(later_demand, later_weights)
+    earlier_rows, later_rows = len(earlier_demand), len(later_demand)
+    estimate = combine_estimates(_weighted_mean(earlier_values, earlier_weights), earlier_rows,
+                                 _weighted_mean(later_values, later_weights), later_rows, percentage)
+    replicate_estimates = combine_estimates(_bootstrap_means(earlier_values, earlier_weights, replicates, rng), earlier_rows,
+                                            _bootstrap_means(later_values, later_weights, replicates, rng), later_rows, percentage)
+    if np.isnan(replicate_estimates).all():
+        return BootstrapInterval(float(estimate), np.nan, np.nan)
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.nanpercentile(replicate_estimates, [tail, 100 - tail])
+    return BootstrapInterval(float(estimate), float(low), float(high))
+
+
+def _bootstrap_task(args):
+    return bootstrap_estimate(*args)
+
+
+def batch_bootstrap(df, earlier_window, later_window, percentage, date_match='overlap', per_day=False, prorate=False,
+                    replicates=BOOTSTRAP_REPLICATES, confidence=BOOTSTRAP_CONFIDENCE, seed=None, workers=None,
+                    country_col='Country', category_col='Category', start_col='Start', end_col='End', demand_col='Demand'):
+    """bootstrap_estimate for every (country, category) pair, optionally spread over a process pool.
+
+    Each pair gets its own child seed, so results do not depend on the number of workers.
+    """
+    demand = df[demand_col].to_numpy(dtype='float64', na_value=np.nan)
+    starts, ends = df[start_col].to_numpy(), df[end_col].to_numpy()
+    windows = [earlier_window, later_window]
+    in_windows = [date_window_mask(df[start_col], df[end_col], *window, how=date_match).to_numpy(dtype=bool)
+                  for window in windows]
+    bases = [demand_basis(demand, starts, ends, window, per_day, prorate) for window in windows]
+    # weights only change the result when they are not all equal
+    weighted = per_day and prorate
+    # the same pairs and labels as batch_estimates, so the two results merge on them
+    labels, groups = _pair_groups(df, country_col, category_col)
+    order = np.argsort(groups, kind='stable')
+    positions = np.split(order, np.searchsorted(groups[order], np.arange(len(labels) + 1)))[1:-1]
+    seeds = np.random.SeedSequence(seed).spawn(len(labels))
+    tasks = []
+    for p, s in zip(positions, seeds):
+        earlier, later = p[in_windows[0][p]], p[in_windows[1][p]]
+        tasks.append((bases[0][0][earlier], bases[1][0][later], percentage, replicates, confidence, s,
+                      bases[0][1][earlier] if weighted else None, bases[1][1][later] if weighted else None))
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            intervals = list(pool.map(_bootstrap_task, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+    else:
+        intervals = [_bootstrap_task(task) for task in tasks]
+    return pd.DataFrame(intervals, index=labels, columns=BootstrapInterval._fields).reset_index()
+
+
+def load_campaign_file(path):
+    """Read and clean an Excel or CSV campaign file the way the apps do, without Streamlit."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if path.lower().endswith('.csv'):
+        from csv_loader import read_campaign_csv
+        df = read_campaign_csv(raw)
+    else:
+        from excel_readers import load_excel_frame
+        df = load_excel_frame(raw)
+    df['Demand'] = parse_demand_series(df['Demand'])
+    df = parse_date_columns(df, ['Start', 'End'])
+    df = normalize_text_columns(df)
+    return encode_categoricals(df)
+
+
+def cli_date(text):
+    """A period bound from the command line: ISO (2023-01-31) or day-first like the data (31.01.2023)."""
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(text, '%d.%m.%Y').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{text}'; use YYYY-MM-DD or DD.MM.YYYY")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estimate demand for every country and category in a campaign file.")
+    parser.add_argument('path', help="campaign file (.xlsx, .xls or .csv)")
+    parser.add_argument('--earlier', nargs=2, type=cli_date, required=True, metavar=('START', 'END'))
+    parser.add_argument('--later', nargs=2, type=cli_date, required=True, metavar=('START', 'END'))
+    parser.add_argument('--growth', type=float, default=0.0, help="target growth from the earlier period, in percent")
+    parser.add_argument('--date-match', choices=['overlap', 'contained'], default='overlap')
+    parser.add_argument('--per-day', action='store_true', help="estimate demand per campaign day")
+    parser.add_argument('--prorate', action='store_true',
+                        help="with --per-day, weight campaigns by the days they overlap each period")
+    parser.add_argument('--bootstrap', type=int, metavar='REPLICATES',
+                        help="add a bootstrap interval per pair, from this many replicates")
+    parser.add_argument('--confidence', type=float, default=BOOTSTRAP_CONFIDENCE)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--workers', type=int, help="processes used for the bootstrap")
+    parser.add_argument('--output', help="write the estimates to this CSV instead of printing them")
+    args = parser.parse_args(argv)
+    for name in PERIODS:
+        start, end = getattr(args, name)
+        if start > end:
+            parser.error(f"--{name}: START {start} is after END {end}")
+
+    df = load_campaign_file(args.path)
+    result = batch_estimates(df, tuple(args.earlier), tuple(args.later), args.growth, args.date_match,
+                             args.per_day, args.prorate)
+    if args.bootstrap:
+        intervals = batch_bootstrap(df, tuple(args.earlier), tuple(args.later), args.growth, args.date_match,
+                                    args.per_day, args.prorate, args.bootstrap, args.confidence, args.seed, args.workers)
+        result = result.merge(intervals.drop(columns='estimate'), on=['Country', 'Category'], how='left')
+    if args.output:
+        result.to_csv(args.output, index=False)
+    else:
+        print(result.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
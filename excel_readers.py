@@ -0,0 +1,226 @@
+import io
+import posixpath
+import re
+import struct
+import xml.etree.ElementTree as ET
+import zipfile
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils import range_boundaries
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+try:
+    import xlrd
+    from xlrd import compdoc
+except ImportError:
+    xlrd = None
+
+XLSX_MAGIC = b'PK\x03\x04'
+XLS_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+XLS_WINDOW1, XLS_EOF = 0x003D, 0x000A
+MERGE_CELLS_START = re.compile(rb'<(?:\w+:)?mergeCells\b')
+MERGE_CELL_REF = re.compile(rb'<(?:\w+:)?mergeCell\b[^>]*?\bref="([^"]+)"')
+
+
+def detect_format(file_bytes):
+    if file_bytes[:4] == XLSX_MAGIC:
+        return 'xlsx'
+    if file_bytes[:8] == XLS_MAGIC:
+        return 'xls'
+    return None
+
+
+def rows_to_grid(rows):
+    width = max((len(r) for r in rows), default=0)
+    if all(len(r) == width for r in rows):
+        return np.array(rows, dtype=object).reshape(len(rows), width)
+    grid = np.full((len(rows), width), None, dtype=object)
+    for i, r in enumerate(rows):
+        grid[i, :len(r)] = r
+    return grid
+
+
+# Every reader returns (grid, merged_ranges): a 2-D object array anchored at A1 and
+# merged ranges as 1-based inclusive (min_row, max_row, min_col, max_col) tuples.
+
+def xlsx_sheet_parts(zf):
+    """(active sheet index, [(sheet name, part path), ...]) from xl/workbook.xml and its relationships."""
+    workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+    rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    targets = {rel.get('Id'): rel.get('Target') for rel in rels}
+    active, sheets = None, []
+    for elem in workbook.iter():
+        tag = elem.tag.rsplit('}', 1)[-1]
+        if tag == 'workbookView' and active is None and elem.get('activeTab') is not None:
+            active = int(elem.get('activeTab'))
+        elif tag == 'sheet':
+            rel_id = next(v for k, v in elem.attrib.items() if k.rsplit('}', 1)[-1] == 'id')
+            target = targets[rel_id]
+            part = target.lstrip('/') if target.startswith('/') else posixpath.normpath(f"xl/{target}")
+            sheets.append((elem.get('name'), part))
+    return (active if active is not None and active < len(sheets) else 0), sheets
+
+
+def xls_active_sheet(file_bytes):
+    """Index of the active sheet, from the WINDOW1 record in the workbook globals (0 if absent)."""
+    doc = compdoc.CompDoc(file_bytes, logfile=io.StringIO())
+    for name in ('Workbook', 'Book'):
+        mem, pos, size = doc.locate_named_stream(name)
+        if mem is not None:
+            break
+    else:
+        return 0
+    end = pos + size
+    while pos + 4 <= end:
+        code, length = struct.unpack_from('<HH', mem, pos)
+        if code == XLS_WINDOW1 and length >= 12:
+            return struct.unpack_from('<H', mem, pos + 14)[0]
+        if code == XLS_EOF:
+            break
+        pos += 4 + length
+    return 0
+
+
+def read_merged_ranges(zf, part, chunk_size=1 << 20):
+    # <mergeCells> follows </sheetData>, so scan the raw bytes for it instead of
+    # parsing every cell a second time
+    tail = b''
+    with zf.open(part) as src:
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                return []
+            block = tail + chunk
+            match = MERGE_CELLS_START.search(block)
+            if match:
+                block = block[match.start():] + src.read()
+                break
+            tail = block[-64:]
+    ranges = []
+    for ref in MERGE_CELL_REF.findall(block):
+        min_col, min_row, max_col, max_row = range_boundaries(ref.decode())
+        ranges.append((min_row, max_row, min_col, max_col))
+    return sorted(ranges)
+
+
+def read_openpyxl(file_bytes):
+    wb = load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        with zipfile.ZipFile(io.BytesIO(file_bytes)) as zf:
+            merged_ranges = read_merged_ranges(zf, dict(xlsx_sheet_parts(zf)[1])[ws.title])
+        # read-only mode trusts the sheet's <dimension> tag, which many exporters leave stale
+        ws.reset_dimensions()
+        grid = rows_to_grid(list(ws.iter_rows(min_row=1, min_col=1, values_only=True)))
+    finally:
+        wb.close()
+    return grid, merged_ranges
+
+
+def read_calamine(file_bytes):
+    # calamine does not report the active sheet, so look it up the way the other readers see it
+    if detect_format(file_bytes) == 'xlsx':
+        with zipfile.ZipFile(io.BytesIO(file_bytes)) as zf:
+            active, sheets = xlsx_sheet_parts(zf)
+        active = sheets[active][0] if sheets else 0
+    else:
+        active = xls_active_sheet(file_bytes) if xlrd is not None else 0
+    wb = CalamineWorkbook.from_filelike(io.BytesIO(file_bytes))
+    try:
+        sheet = wb.get_sheet_by_name(active) if isinstance(active, str) else wb.get_sheet_by_index(active)
+        grid = rows_to_grid(sheet.to_python(skip_empty_area=False))
+        merged_ranges = [(r0 + 1, r1 + 1, c0 + 1, c1 + 1)
+                         for (r0, c0), (r1, c1) in (sheet.merged_cell_ranges or [])]
+    finally:
+        wb.close()
+    grid[grid == ''] = None
+    # calamine gives date-only cells as dates; the other engines return datetimes
+    date_mask = np.frompyfunc(lambda v: type(v) is date, 1, 1)(grid).astype(bool)
+    if date_mask.any():
+        grid[date_mask] = [datetime(v.year, v.month, v.day) for v in grid[date_mask]]
+    return grid, sorted(merged_ranges)
+
+
+def read_xlrd(file_bytes):
+    book = xlrd.open_workbook(file_contents=file_bytes, formatting_info=True, on_demand=True)
+    try:
+        # only the active sheet is loaded
+        active = xls_active_sheet(file_bytes)
+        sheet = book.sheet_by_index(active if active < book.nsheets else 0)
+        grid = rows_to_grid([sheet.row_values(r) for r in range(sheet.nrows)])
+        types = rows_to_grid([tuple(sheet.row_types(r)) for r in range(sheet.nrows)])
+        merged_ranges = [(rlo + 1, rhi, clo + 1, chi) for rlo, rhi, clo, chi in sheet.merged_cells]
+        datemode = book.datemode
+    finally:
+        book.release_resources()
+    grid[(types == xlrd.XL_CELL_EMPTY) | (types == xlrd.XL_CELL_BLANK)] = None
+    date_mask = types == xlrd.XL_CELL_DATE
+    if date_mask.any():
+        grid[date_mask] = [xlrd.xldate_as_datetime(v, datemode) for v in grid[date_mask]]
+    return grid, sorted(merged_ranges)
+
+
+ENGINES = {
+    'calamine': (read_calamine, ('xlsx', 'xls')),
+    'xlrd': (read_xlrd, ('xls',)),
+    'openpyxl': (read_openpyxl, ('xlsx',)),
+}
+ENGINE_PREFERENCE = ['calamine', 'xlrd', 'openpyxl']
+
+
+def engine_installed(name):
+    if name == 'calamine':
+        return CalamineWorkbook is not None
+    if name == 'xlrd':
+        return xlrd is not None
+    return True
+
+
+def available_engines(file_format):
+    return [name for name in ENGINE_PREFERENCE
+            if file_format in ENGINES[name][1] and engine_installed(name)]
+
+
+def fill_merged_ranges(grid, merged_ranges):
+    n_rows, n_cols = grid.shape
+    for min_row, max_row, min_col, max_col in merged_ranges:
+        if min_row > n_rows or min_col > n_cols:
+            continue
+        grid[min_row - 1:max_row, min_col - 1:max_col] = grid[min_row - 1, min_col - 1]
+    return grid
+
+
+def load_excel_frame(file_bytes, engine=None):
+    """Read the active sheet into a DataFrame with merged cells and gaps forward-filled.
+
+    The engine is picked from ENGINE_PREFERENCE unless given explicitly; the one
+    used is recorded in df.attrs['excel_engine'].
+    """
+    file_format = detect_format(file_bytes)
+    if file_format is None:
+        raise ValueError("Unrecognised Excel file; expected .xlsx or .xls content.")
+    candidates = available_engines(file_format)
+    if engine is not None:
+        if engine not in candidates:
+            raise ValueError(f"Engine '{engine}' cannot read .{file_format} files here; available: {candidates}")
+        candidates = [engine]
+    if not candidates:
+        raise ValueError(f"No installed engine can read .{file_format} files.")
+
+    engine = candidates[0]
+    grid, merged_ranges = ENGINES[engine][0](file_bytes)
+    if grid.shape[0] == 0:
+        df = pd.DataFrame()
+    else:
+        grid = fill_merged_ranges(grid, merged_ranges)
+        df = pd.DataFrame(grid[1:], columns=list(grid[0])).ffill().infer_objects()
+        df.columns = df.columns.astype(str).str.strip().str.replace('[\u00A0\u202F]', '', regex=True)
+    df.attrs['excel_engine'] = engine
+    return df
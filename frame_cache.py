@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+FRAME_CACHE_MAX_ENTRIES = int(os.environ.get('CAMPAIGN_FRAME_CACHE_MAX_ENTRIES', 8))
+FRAME_CACHE_MAX_BYTES = int(os.environ.get('CAMPAIGN_FRAME_CACHE_MAX_BYTES', 1024 ** 3))
+FRAME_CACHE_TTL = float(os.environ.get('CAMPAIGN_FRAME_CACHE_TTL', 3600))
+
+
+def frame_nbytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+class FrameCache:
+    """Process-wide LRU of parsed DataFrames bounded by entry count, deep memory size and age.
+
+    get() hands out shallow copies, so callers may rename or replace columns
+    but must not write into existing column values. Other objects built from
+    a frame (such as its search index) can share the budget by passing their
+    size to put(); they are returned as stored.
+    """
+
+    def __init__(self, max_entries=FRAME_CACHE_MAX_ENTRIES, max_bytes=FRAME_CACHE_MAX_BYTES,
+                 ttl=FRAME_CACHE_TTL, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and self._clock() - entry[2] > self.ttl:
+                self._drop(key)
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[0]
+            return value.copy(deep=False) if isinstance(value, pd.DataFrame) else value
+
+    def put(self, key, df, nbytes=None):
+        size = frame_nbytes(df) if nbytes is None else nbytes
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if self.ttl:
+                now = self._clock()
+                for stale in [k for k, e in self._entries.items() if now - e[2] > self.ttl]:
+                    self._drop(stale)
+                    self.evictions += 1
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (df, size, self._clock())
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
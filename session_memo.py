@@ -0,0 +1,21 @@
+import streamlit as st
+
+import upload_cache
+
+
+def session_memo(name, key, compute):
+    """Return compute() for key, kept in session state until the same name is asked for with another key.
+
+    Holds one result per name, so a session never accumulates stale frames.
+    """
+    stored = st.session_state.get(name)
+    if stored is None or stored[0] != key:
+        stored = (key, compute())
+        st.session_state[name] = stored
+    return stored[1]
+
+
+def upload_key(uploaded_file, salt=''):
+    """Content key of an upload, hashed once per (file_id, size) and read back from session state on reruns."""
+    return session_memo('upload_key', (uploaded_file.file_id, uploaded_file.size, salt),
+                        lambda: upload_cache.content_key(uploaded_file.getvalue(), salt))
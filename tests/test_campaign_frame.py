@@ -0,0 +1,67 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from campaign_frame import (category_options, encode_categoricals, infer_date_format, normalize_text_columns,
+                            parse_date_column)
+
+
+def as_list(series):
+    return [None if pd.isna(v) else v for v in series]
+
+
+@pytest.mark.parametrize('values, expected_format', [
+    (['02.01.2023', '31.12.2023'], '%d.%m.%Y'),
+    (['02/01/2023', '31/12/2023'], '%d/%m/%Y'),
+    (['2023-01-02', '2023-12-31'], '%Y-%m-%d'),
+    (['02.01.2023 08:30', '31.12.2023 17:00'], '%d.%m.%Y %H:%M'),
+    (['soon', 'later'], None),
+])
+def test_infer_date_format(values, expected_format):
+    assert infer_date_format(pd.Series(values)) == expected_format
+
+
+def test_text_dates_are_read_day_first():
+    parsed = parse_date_column(pd.Series(['02.01.2023', '13.01.2023', ' 01.03.2024 ']))
+    assert parsed.dtype == 'datetime64[ns]'
+    assert as_list(parsed) == [pd.Timestamp(2023, 1, 2), pd.Timestamp(2023, 1, 13), pd.Timestamp(2024, 3, 1)]
+
+
+def test_outliers_fall_back_to_iso_then_day_first():
+    parsed = parse_date_column(pd.Series(['02.01.2023', '03.01.2023', '2024-03-01', '5/2/2023']))
+    assert as_list(parsed)[2:] == [pd.Timestamp(2024, 3, 1), pd.Timestamp(2023, 2, 5)]
+
+
+def test_missing_blank_and_garbage_become_nat():
+    parsed = parse_date_column(pd.Series(['02.01.2023', '', None, np.nan, 'n/a'], dtype=object))
+    assert as_list(parsed) == [pd.Timestamp(2023, 1, 2), None, None, None, None]
+
+
+def test_date_objects_and_mixed_columns():
+    values = pd.Series([datetime(2023, 1, 2, 9, 30), date(2023, 1, 3), pd.Timestamp(2023, 1, 4), '05.01.2023'],
+                       dtype=object)
+    assert as_list(parse_date_column(values)) == [pd.Timestamp(2023, 1, 2, 9, 30), pd.Timestamp(2023, 1, 3),
+                                                  pd.Timestamp(2023, 1, 4), pd.Timestamp(2023, 1, 5)]
+
+
+def test_datetime_columns_keep_their_values():
+    values = pd.Series(pd.to_datetime(['2023-01-02', None]))
+    parsed = parse_date_column(values)
+    assert parsed.dtype == 'datetime64[ns]'
+    assert as_list(parsed) == [pd.Timestamp(2023, 1, 2), None]
+
+
+def test_string_dtype_column():
+    parsed = parse_date_column(pd.Series(['02.01.2023', None], dtype='str'))
+    assert as_list(parsed) == [pd.Timestamp(2023, 1, 2), None]
+
+
+def test_normalize_text_columns_keeps_missing_values_missing():
+    df = pd.DataFrame({'Name': [' Spring\u00a0Sale ', None], 'Category': ['Toys', np.nan]}, dtype=object)
+    df = encode_categoricals(normalize_text_columns(df, ['Name', 'Category']), ['Category', 'Category__key'])
+    assert as_list(df['Name']) == ['SpringSale', None]
+    assert as_list(df['Name__key']) == ['springsale', None]
+    assert category_options(df['Category']) == ['Toys']
+    assert category_options(df['Category__key']) == ['toys']
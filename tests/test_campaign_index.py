@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from campaign_index import (build_date_intervals, build_partition_index, build_trigram_index, date_window_mask,
+                            partition_intervals, partition_positions, query_date_intervals, trigram_candidates,
+                            trigram_index_nbytes)
+
+
+def campaigns(n_rows=500, seed=0):
+    rng = np.random.default_rng(seed)
+    starts = pd.Timestamp(2023, 1, 1) + pd.to_timedelta(rng.integers(0, 365, n_rows), unit='D')
+    ends = starts + pd.to_timedelta(rng.integers(-2, 90, n_rows), unit='D')
+    df = pd.DataFrame({
+        'Country': rng.choice(['PL', 'DE'], n_rows),
+        'Category': rng.choice(['Toys', ' toys', 'Garden'], n_rows),
+        'Start': starts,
+        'End': ends,
+    })
+    df.loc[::37, 'Start'] = pd.NaT
+    df.loc[::41, 'End'] = pd.NaT
+    return df
+
+
+WINDOWS = [('2023-03-01', '2023-03-31'), ('2023-01-01', '2023-12-31'), ('2024-06-01', '2024-06-30'),
+           ('2023-05-10', '2023-05-10')]
+
+
+@pytest.mark.parametrize('how', ['overlap', 'contained'])
+@pytest.mark.parametrize('window', WINDOWS)
+def test_query_matches_boolean_mask(how, window):
+    df = campaigns()
+    intervals = build_date_intervals(df, np.arange(len(df)))
+    expected = np.flatnonzero(date_window_mask(df['Start'], df['End'], *window, how=how).to_numpy())
+    np.testing.assert_array_equal(query_date_intervals(intervals, *window, how=how), expected)
+
+
+def test_query_on_a_partition_returns_positions_in_the_frame():
+    df = campaigns()
+    index = build_partition_index(df)
+    intervals = partition_intervals(index, df, 'PL', 'TOYS')
+    in_slice = ((df['Country'] == 'PL') & (df['Category'].str.strip().str.casefold() == 'toys')).to_numpy()
+    window = date_window_mask(df['Start'], df['End'], *WINDOWS[0]).to_numpy()
+    np.testing.assert_array_equal(query_date_intervals(intervals, *WINDOWS[0]), np.flatnonzero(in_slice & window))
+    assert partition_intervals(index, df, 'PL', 'toys') is intervals
+
+
+def test_partition_positions():
+    df = campaigns()
+    index = build_partition_index(df)
+    np.testing.assert_array_equal(partition_positions(index, 'DE'), np.flatnonzero(df['Country'] == 'DE'))
+    np.testing.assert_array_equal(partition_positions(index, 'DE', 'All'), partition_positions(index, 'DE'))
+    assert len(partition_positions(index, 'FR')) == 0
+    assert len(partition_positions(index, 'PL', 'Books')) == 0
+
+
+def test_empty_slice_and_unknown_mode():
+    df = campaigns()
+    intervals = build_date_intervals(df, np.array([], dtype=np.intp))
+    assert len(query_date_intervals(intervals, *WINDOWS[0])) == 0
+    with pytest.raises(ValueError):
+        query_date_intervals(intervals, *WINDOWS[0], how='touching')
+
+
+def search_frame():
+    names = ['spring sale', 'summer sale', 'garden week', None, 'zażółć', 'salesforce promo', 'sa', '']
+    return pd.DataFrame({'Name__key': names * 5,
+                         'Description__key': ['toys week 1', None, 'week 12 garden', 'sale', 'x', 'y', 'z', 'lesa'] * 5})
+
+
+@pytest.mark.parametrize('pattern', ['sale', 'week 1', 'garden', 'żół', 'lesa', 'sal', 'nothing'])
+def test_trigram_candidates_contain_every_match(pattern):
+    df = search_frame()
+    index = build_trigram_index(df, ['Name__key', 'Description__key'])
+    candidates = trigram_candidates(index, pattern)
+    matches = np.flatnonzero(df['Name__key'].str.contains(pattern, regex=False, na=False)
+                             | df['Description__key'].str.contains(pattern, regex=False, na=False))
+    assert np.all(np.diff(candidates) > 0)
+    assert set(matches) <= set(candidates)
+
+
+def test_trigrams_do_not_span_columns_or_rows():
+    index = build_trigram_index(pd.DataFrame({'Name__key': ['abc', 'xyz'], 'Description__key': ['def', 'uvw']}),
+                                ['Name__key', 'Description__key'])
+    assert len(trigram_candidates(index, 'bcd')) == 0
+    assert len(trigram_candidates(index, 'efx')) == 0
+    np.testing.assert_array_equal(trigram_candidates(index, 'uvw'), [1])
+
+
+def test_trigram_candidates_short_and_unknown_patterns():
+    index = build_trigram_index(search_frame(), ['Name__key'])
+    assert trigram_candidates(index, 'sa') is None
+    assert len(trigram_candidates(index, 'qqq')) == 0
+
+
+def test_trigram_index_is_the_same_for_any_block_size():
+    df = search_frame()
+    whole = build_trigram_index(df, ['Name__key', 'Description__key'])
+    blocked = build_trigram_index(df, ['Name__key', 'Description__key'], block_rows=3)
+    for a, b in zip(whole, blocked):
+        np.testing.assert_array_equal(a, b)
+    assert whole.rows.dtype == np.int32
+    assert trigram_index_nbytes(whole) == sum(a.nbytes for a in whole)
+
+
+def test_trigram_index_of_an_empty_frame():
+    index = build_trigram_index(pd.DataFrame({'Name__key': []}), ['Name__key', 'Description__key'])
+    assert len(trigram_candidates(index, 'sale')) == 0
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+import streamlit as st
+
+from benchmark import loaded_frame
+from campaign_selection import (new_selection, selected_values, selection_state, selection_stats, set_basis,
+                                set_included)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(st, 'session_state', {})
+
+
+def test_running_totals_match_a_recomputed_mean():
+    df = loaded_frame(2_000)
+    df.loc[df.index[::97], 'Demand'] = np.nan
+    rng = np.random.default_rng(1)
+    include = np.ones(len(df), dtype=bool)
+    selection = new_selection(df['Demand'])
+    for position, value in zip(rng.integers(0, len(df), 500), rng.integers(0, 2, 500).astype(bool)):
+        include[position] = value
+        set_included(selection, [position], value)
+    mean, rows = selection_stats(selection)
+    assert rows == include.sum()
+    assert mean == pytest.approx(df.loc[include, 'Demand'].mean(), rel=1e-9)
+
+
+def test_set_included_accepts_a_mask_and_ignores_unchanged_rows():
+    selection = new_selection([10.0, 20.0, np.nan, 40.0])
+    set_included(selection, np.array([True, False, True, False]), False)
+    set_included(selection, [0, 2], False)
+    assert selection_stats(selection) == (30.0, 2)
+    set_included(selection, [1, 3], False)
+    mean, rows = selection_stats(selection)
+    assert np.isnan(mean) and rows == 0
+
+
+def test_selection_stats_of_a_missing_selection():
+    mean, rows = selection_stats(None)
+    assert np.isnan(mean) and rows == 0
+
+
+def test_set_basis_keeps_the_include_flags():
+    selection = new_selection([10.0, 20.0, 30.0])
+    set_included(selection, [0], False)
+    set_basis(selection, [1.0, 2.0, 3.0], [0.0, 1.0, 3.0])
+    assert selection_stats(selection) == ((2.0 + 9.0) / 4, 2)
+    values, weights = selected_values(selection)
+    assert values.tolist() == [2.0, 3.0] and weights.tolist() == [1.0, 3.0]
+
+
+def test_selection_state_is_rebuilt_for_another_upload_with_the_same_labels(session):
+    first = pd.DataFrame({'Demand': [1.0, 2.0, 3.0]}, index=[0, 5, 9])
+    second = pd.DataFrame({'Demand': [100.0, 200.0, 300.0]}, index=[0, 5, 9])
+    assert selection_stats(selection_state('earlier', first)) == (2.0, 3)
+    assert selection_stats(selection_state('earlier', second)) == (200.0, 3)
+
+
+def test_selection_state_keeps_flags_across_reruns_and_basis_changes(session):
+    df = pd.DataFrame({'Demand': [10.0, 20.0, 30.0]}, index=[3, 4, 7])
+    set_included(selection_state('later', df), [2], False)
+    assert selection_stats(selection_state('later', df.copy())) == (15.0, 2)
+    doubled = ('doubled', lambda: (df['Demand'] * 2, None))
+    assert selection_stats(selection_state('later', df, doubled)) == (30.0, 2)
@@ -0,0 +1,56 @@
+import pytest
+
+import csv_loader
+
+LATE_NAME = 'Zażółć gęślą jaźń'
+
+
+def late_non_ascii_csv(encoding, n_rows=5001):
+    # the first non-ascii character sits well past the encoding sample
+    rows = ['Country;Name;Demand'] + [f'PL;Campaign {i};{i},50' for i in range(n_rows)]
+    rows.append(f'PL;{LATE_NAME};12,00')
+    return ('\n'.join(rows) + '\n').encode(encoding)
+
+
+@pytest.mark.parametrize('sample, expected', [
+    ('Country;Name;Demand\nPL;A;1\nDE;B;2\n', (';', ['Country', 'Name', 'Demand'])),
+    ('Country\tName\tDemand\nPL\tA\t1\nDE\tB\t2\n', ('\t', ['Country', 'Name', 'Demand'])),
+    ('Country,Name,Demand\nPL,"A, B",1\nDE,C,2\n', (',', ['Country', 'Name', 'Demand'])),
+])
+def test_sniff_dialect(sample, expected):
+    delimiter, quotechar, header = csv_loader.sniff_dialect(sample.encode('utf-8'), 'utf-8')
+    assert (delimiter, header) == expected and quotechar == '"'
+
+
+def test_sniff_dialect_ignores_a_truncated_last_line():
+    raw = ('Country;Name;Demand\n' + 'PL;Campaign;1\n' * 2000).encode('utf-8')
+    assert len(raw) > csv_loader.SNIFF_SAMPLE_BYTES
+    assert csv_loader.sniff_dialect(raw, 'utf-8')[0] == ';'
+
+
+def test_sniff_dialect_defaults_to_semicolon():
+    assert csv_loader.sniff_dialect(b'Demand\n', 'utf-8')[0] == csv_loader.DEFAULT_DELIMITER
+
+
+def test_detect_encoding_all_ascii_is_utf8():
+    assert csv_loader.detect_encoding(b'Country;Demand\nPL;1\n') == 'utf-8'
+
+
+def test_late_utf8_text_is_decoded():
+    df = csv_loader.read_campaign_csv(late_non_ascii_csv('utf-8'))
+    assert df.attrs['csv_encoding'] == 'utf-8'
+    assert df['Name'].iloc[-1] == LATE_NAME
+
+
+def test_late_cp1250_text_does_not_fail():
+    raw = late_non_ascii_csv('cp1250')
+    df = csv_loader.read_campaign_csv(raw)
+    assert len(df) == 5002
+    assert df['Name'].iloc[-1] == LATE_NAME.encode('cp1250').decode(df.attrs['csv_encoding'])
+
+
+def test_undecodable_file_falls_back_to_cp1252(monkeypatch):
+    monkeypatch.setattr(csv_loader, 'detect_encoding', lambda raw: 'utf-8')
+    df = csv_loader.read_campaign_csv('Country;Name;Demand\nFR;Café;1\n'.encode('cp1252'))
+    assert df.attrs['csv_encoding'] == csv_loader.FALLBACK_ENCODING
+    assert df['Name'].tolist() == ['Café']
@@ -0,0 +1,83 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import legacy_parse_demand, legacy_parse_demand_eu, synthetic_rows
+from demand_parsing import infer_number_format, parse_demand_series
+
+
+def assert_parsed(expected, actual):
+    np.testing.assert_array_equal(pd.Series(expected, dtype='float64').to_numpy(),
+                                  pd.Series(actual, dtype='float64').to_numpy())
+
+
+# (values, expected decimal separator, expected parse) for files written in different locales
+@pytest.mark.parametrize('values, decimal, expected', [
+    (['1\u00a0234,50 €', '12,5', '7', '-', '', 12.5], ',', [1234.5, 12.5, 7.0, None, None, 12.5]),
+    (['1\u202f234 €', '-1 500,25', '2 000 000 000 000', 'abc'], ',', [1234.0, -1500.25, None, None]),
+    (['1.234,5 €', '1.234.567', '0,99', '1,234,567'], ',', [1234.5, 1234567.0, 0.99, None]),
+    (['1,234.50 $', '12.5', '1,000', '.5', '1.2.3'], '.', [1234.5, 12.5, 1000.0, 0.5, None]),
+    (['1.234', '2.500'], ',', [1234.0, 2500.0]),
+    ([None, np.nan, True, 3, -3.25], ',', [None, None, None, 3.0, -3.25]),
+])
+def test_parse_demand_series(values, decimal, expected):
+    values = pd.Series(values, dtype=object)
+    assert infer_number_format(values).decimal == decimal
+    assert_parsed(expected, parse_demand_series(values))
+
+
+# columns the app.py parser handled correctly: numbers, and text with a single ',' decimal
+@pytest.mark.parametrize('values', [
+    ['1\u00a0234,50 €', '12,5', '7', '-', '', 12.5],
+    ['1\u202f234 €', '-1 500,25', '2 000 000 000 000', 'abc', '€'],
+    ['0,99', '-3', None, np.nan, 3, -3.25, True],
+    ['12\u00a0345 €', '99,9 EUR', 'n/a', '1\u00a0000\u00a0000,01'],
+])
+def test_matches_legacy_app_parser(values):
+    values = pd.Series(values, dtype=object)
+    assert_parsed(values.map(legacy_parse_demand), parse_demand_series(values))
+
+
+# columns the v2 parser handled correctly: CSV text with '.' thousands and ',' decimals
+@pytest.mark.parametrize('values', [
+    ['1.234,5 €', '1.234.567', '0,99', '12,5', '-1 500,25', '7', '-', ''],
+    ['1.234', '2.500', '10.000,00 €', None],
+    ['1 234,50', '999 999,99', 'abc', '€'],
+])
+def test_matches_legacy_v2_parser(values):
+    values = pd.Series(values, dtype=object)
+    assert_parsed(values.map(legacy_parse_demand_eu), parse_demand_series(values))
+
+
+def test_matches_legacy_app_parser_on_synthetic_export():
+    values = pd.Series([row[5] for row in synthetic_rows(2_000)], dtype=object)
+    assert_parsed(values.map(legacy_parse_demand), parse_demand_series(values))
+
+
+def test_numeric_and_string_dtypes():
+    assert_parsed([1.5, None], parse_demand_series(pd.Series([1.5, np.nan])))
+    assert_parsed([1234.5, None], parse_demand_series(pd.Series(['1.234,5', None], dtype='str')))
+
+
+def test_explicit_number_format_is_used_and_recorded():
+    values = pd.Series(['1.234', '2.500'], dtype=object)
+    number_format = infer_number_format(pd.Series(['1,234.50'], dtype=object))
+    parsed = parse_demand_series(values, number_format)
+    assert_parsed([1.234, 2.5], parsed)
+    assert parsed.attrs['number_format'] == number_format
+
+
+def test_numpy_and_decimal_scalars_in_object_columns():
+    values = pd.Series([np.int64(1234), np.float32(2.5), Decimal('10.25'), np.bool_(True), '7,5'], dtype=object)
+    assert_parsed([1234.0, 2.5, 10.25, None, 7.5], parse_demand_series(values))
+
+
+@pytest.mark.parametrize('values, currency', [
+    (['1 234,50 €', '12 €', '7'], '€'),
+    (['1 234 zł', '99,99 zł', '10 PLN'], 'zł'),
+    (['1e3', 'n/a', '12,5'], None),
+])
+def test_currency(values, currency):
+    assert infer_number_format(pd.Series(values, dtype=object)).currency == currency
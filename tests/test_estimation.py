@@ -0,0 +1,186 @@
+import argparse
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import CATEGORIES, COUNTRIES, estimate_demand, loaded_frame, loop_bootstrap, row_wise_per_day_mean
+from campaign_filters import filter_data_windows
+from campaign_index import DATE_MATCH_MODES, build_partition_index
+from estimation import (GROWTH_SWEEP, batch_bootstrap, batch_estimates, bootstrap_estimate, cli_date,
+                        combine_estimates, demand_basis, growth_curve, main)
+
+EARLIER = (datetime(2023, 1, 1), datetime(2023, 3, 31))
+LATER = (datetime(2024, 1, 1), datetime(2024, 3, 31))
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('2023-01-02', date(2023, 1, 2)),
+    ('02.01.2023', date(2023, 1, 2)),
+    ('31.12.2023', date(2023, 12, 31)),
+])
+def test_cli_date(text, expected):
+    assert cli_date(text) == expected
+
+
+@pytest.mark.parametrize('text', ['01/02/2023', '2023-13-01', '32.01.2023', 'yesterday'])
+def test_cli_date_rejects_ambiguous_or_invalid_dates(text):
+    with pytest.raises(argparse.ArgumentTypeError):
+        cli_date(text)
+
+
+def test_main_rejects_a_reversed_window(tmp_path):
+    path = tmp_path / 'campaigns.csv'
+    path.write_text('Country;Name;Description;Start;End;Demand\nPL;A;a;02.01.2023;05.01.2023;10\n')
+    with pytest.raises(SystemExit):
+        main([str(path), '--earlier', '2023-07-01', '2023-06-30', '--later', '2024-01-01', '2024-06-30'])
+
+
+@pytest.mark.parametrize('earlier_mean, earlier_rows, later_mean, later_rows, expected', [
+    (100.0, 3, 200.0, 2, (110.0 + 200.0) / 2),
+    (100.0, 3, np.nan, 0, 110.0),
+    (np.nan, 0, 200.0, 2, 200.0),
+    (np.nan, 0, np.nan, 0, np.nan),
+])
+def test_combine_estimates(earlier_mean, earlier_rows, later_mean, later_rows, expected):
+    actual = combine_estimates(earlier_mean, earlier_rows, later_mean, later_rows, 10)
+    np.testing.assert_allclose(actual, expected)
+
+
+def test_combine_estimates_broadcasts_over_growth():
+    actual = combine_estimates(100.0, 1, 200.0, 1, np.array([-50, 0, 100]))
+    np.testing.assert_allclose(actual, [125.0, 150.0, 200.0])
+
+
+def test_growth_curve_matches_one_growth_at_a_time():
+    df = loaded_frame(200)
+    earlier, later = df.iloc[:120], df.iloc[120:]
+    curve = growth_curve(earlier['Demand'].mean(), len(earlier), later['Demand'].mean(), len(later))
+    low, high = GROWTH_SWEEP
+    assert curve.index.tolist() == list(range(low, high + 1))
+    expected = [estimate_demand(earlier, later, growth) for growth in range(low, high + 1)]
+    np.testing.assert_allclose(curve['estimate'].to_numpy(), expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize('date_match', DATE_MATCH_MODES)
+def test_batch_estimates_match_one_pair_at_a_time(date_match):
+    df = loaded_frame(5_000)
+    df.loc[df.index[::13], 'Demand'] = np.nan
+    index = build_partition_index(df)
+    expected = [estimate_demand(filter_data_windows(df, country, '', [EARLIER], category, index, date_match)[0],
+                                filter_data_windows(df, country, '', [LATER], category, index, date_match)[0], 10)
+                for country in COUNTRIES for category in CATEGORIES]
+    expected = pd.Series(expected, index=pd.MultiIndex.from_product([COUNTRIES, CATEGORIES]), dtype='float64')
+    batch = batch_estimates(df, EARLIER, LATER, 10, date_match).set_index(['Country', 'Category'])['estimate']
+    np.testing.assert_allclose(batch.reindex(expected.index).to_numpy(), expected.to_numpy(), rtol=1e-9)
+
+
+def test_batch_estimates_count_campaigns_per_period():
+    df = pd.DataFrame({
+        'Country': ['PL', 'PL', 'PL', 'DE'],
+        'Category': ['Toys', 'Toys', 'Toys', 'Books'],
+        'Start': pd.to_datetime(['2023-01-10', '2023-02-01', '2024-01-05', '2024-02-01']),
+        'End': pd.to_datetime(['2023-01-20', '2023-02-10', '2024-01-15', '2024-02-05']),
+        'Demand': [100.0, 300.0, 500.0, 40.0],
+    })
+    result = batch_estimates(df, EARLIER, LATER, 10).set_index(['Country', 'Category'])
+    assert result.loc[('PL', 'Toys'), ['earlier_campaigns', 'later_campaigns']].tolist() == [2, 1]
+    assert result.loc[('PL', 'Toys'), 'estimate'] == pytest.approx((200.0 * 1.1 + 500.0) / 2)
+    assert result.loc[('DE', 'Books'), 'estimate'] == pytest.approx(40.0)
+
+
+def test_bootstrap_estimate_matches_a_loop_and_is_reproducible():
+    rng = np.random.default_rng(2)
+    earlier, later = rng.gamma(2.0, 5000.0, 40), rng.gamma(2.0, 5000.0, 60)
+    interval = bootstrap_estimate(earlier, later, 10, 500, 0.95, seed=7)
+    np.testing.assert_allclose([interval.low, interval.high], loop_bootstrap(earlier, later, 10, 500, 0.95, seed=7), rtol=1e-9)
+    assert interval == bootstrap_estimate(earlier, later, 10, 500, 0.95, seed=7)
+    assert interval != bootstrap_estimate(earlier, later, 10, 500, 0.95, seed=8)
+    assert interval.estimate == pytest.approx(combine_estimates(earlier.mean(), 40, later.mean(), 60, 10))
+    assert interval.low < interval.estimate < interval.high
+
+
+def test_bootstrap_estimate_skips_missing_demand():
+    interval = bootstrap_estimate([100.0, np.nan], [np.nan, 300.0, 500.0], 10, 200, seed=1)
+    assert interval.estimate == pytest.approx((110.0 + 400.0) / 2)
+    assert (110.0 + 300.0) / 2 <= interval.low <= interval.high <= (110.0 + 500.0) / 2
+
+
+@pytest.mark.parametrize('earlier, later', [([np.nan, np.nan], [np.nan]), ([], [])])
+def test_bootstrap_estimate_without_demand_has_no_interval(earlier, later):
+    interval = bootstrap_estimate(earlier, later, 10, 200, seed=1)
+    assert np.isnan(interval.estimate) and np.isnan(interval.low) and np.isnan(interval.high)
+
+
+def mixed_case_frame():
+    df = loaded_frame(1_000)
+    df['Category'] = df['Category'].astype(str)
+    df.loc[df.index[::3], 'Category'] = df.loc[df.index[::3], 'Category'].str.upper()
+    df.loc[df.index[::5], 'Category'] = ' ' + df.loc[df.index[::5], 'Category'].str.lower()
+    return df
+
+
+def test_batch_bootstrap_does_not_depend_on_the_worker_count():
+    df = mixed_case_frame()
+    serial = batch_bootstrap(df, EARLIER, LATER, 10, replicates=200, seed=5)
+    pooled = batch_bootstrap(df, EARLIER, LATER, 10, replicates=200, seed=5, workers=2)
+    pd.testing.assert_frame_equal(serial, pooled)
+
+
+def test_batch_bootstrap_uses_the_batch_estimate_pairs():
+    df = mixed_case_frame()
+    estimates = batch_estimates(df, EARLIER, LATER, 10)
+    intervals = batch_bootstrap(df, EARLIER, LATER, 10, replicates=200, seed=5)
+    pd.testing.assert_frame_equal(intervals[['Country', 'Category']], estimates[['Country', 'Category']])
+    np.testing.assert_allclose(intervals['estimate'], estimates['estimate'], rtol=1e-9)
+
+
+def test_batch_results_are_empty_without_any_category():
+    df = loaded_frame(50)
+    df['Category'] = pd.Series([None] * len(df), dtype=object, index=df.index)
+    assert batch_estimates(df, EARLIER, LATER, 10).empty
+    intervals = batch_bootstrap(df, EARLIER, LATER, 10, replicates=50)
+    assert intervals.empty and intervals.columns.tolist() == ['Country', 'Category', 'estimate', 'low', 'high']
+
+
+def test_main_bootstrap_intervals_line_up_with_the_estimates(tmp_path, capsys):
+    path = tmp_path / 'campaigns.csv'
+    path.write_text('Country;Category;Name;Description;Start;End;Demand\n'
+                    'PL;toys;A;a;02.01.2023;05.01.2023;10\n'
+                    'PL;Toys;B;b;03.01.2023;09.01.2023;30\n'
+                    'PL;Toys;C;c;04.01.2024;08.01.2024;20\n')
+    out = tmp_path / 'estimates.csv'
+    main([str(path), '--earlier', '2023-01-01', '2023-06-30', '--later', '2024-01-01', '2024-06-30',
+          '--bootstrap', '200', '--seed', '1', '--output', str(out)])
+    result = pd.read_csv(out)
+    assert result[['Country', 'Category']].values.tolist() == [['PL', 'toys']]
+    assert result[['low', 'high']].notna().all(axis=None)
+
+
+def test_demand_basis_per_day_and_prorated():
+    starts = pd.to_datetime(['2023-01-01', '2023-03-25', '2023-01-10', None, '2023-02-01'])
+    ends = pd.to_datetime(['2023-01-10', '2023-04-03', '2023-01-01', '2023-01-05', '2023-02-05'])
+    demand = [100.0, 50.0, 30.0, 20.0, np.nan]
+    values, weights = demand_basis(demand, starts, ends)
+    assert weights.tolist() == [1, 1, 1, 1, 0]
+    values, weights = demand_basis(demand, starts, ends, EARLIER, per_day=True)
+    np.testing.assert_allclose(values, [10.0, 5.0, np.nan, np.nan, np.nan])
+    assert weights.tolist() == [1, 1, 0, 0, 0]
+    # the second campaign runs 10 days, 7 of them inside the window
+    values, weights = demand_basis(demand, starts, ends, EARLIER, per_day=True, prorate=True)
+    np.testing.assert_allclose(values, [10.0, 5.0, np.nan, np.nan, np.nan])
+    assert weights.tolist() == [10, 7, 0, 0, 0]
+
+
+@pytest.mark.parametrize('prorate', [False, True])
+def test_per_day_batch_means_match_a_row_wise_mean(prorate):
+    df = loaded_frame(5_000)
+    df.loc[df.index[::13], 'Demand'] = np.nan
+    index = build_partition_index(df)
+    batch = batch_estimates(df, EARLIER, LATER, 10, per_day=True, prorate=prorate).set_index(['Country', 'Category'])
+    for country, category in [('PL', 'Toys'), ('HU', 'Books'), ('DE', 'Garden')]:
+        for period, window in [('earlier', EARLIER), ('later', LATER)]:
+            campaigns = filter_data_windows(df, country, '', [window], category, index)[0]
+            assert batch.loc[(country, category), f'{period}_mean'] == pytest.approx(
+                row_wise_per_day_mean(campaigns, window, prorate), rel=1e-9)
@@ -0,0 +1,183 @@
+import io
+import re
+import zipfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from excel_readers import (available_engines, fill_merged_ranges, load_excel_frame, read_merged_ranges,
+                           xls_active_sheet, xlsx_sheet_parts)
+
+
+def xlsx_bytes(wb):
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def rewrite_part(file_bytes, part, rewrite):
+    src, out = zipfile.ZipFile(io.BytesIO(file_bytes)), io.BytesIO()
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            dst.writestr(item, rewrite(data) if item.filename == part else data)
+    return out.getvalue()
+
+
+def campaign_workbook():
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['Country', 'Name', 'Demand'])
+    ws.append(['PL', 'Spring', 10])
+    ws.append(['DE', 'Summer', 20])
+    return wb
+
+
+def test_openpyxl_ignores_a_stale_dimension():
+    file_bytes = rewrite_part(xlsx_bytes(campaign_workbook()), 'xl/worksheets/sheet1.xml',
+                              lambda xml: re.sub(rb'<dimension ref="[^"]*"', b'<dimension ref="A1"', xml))
+    assert b'<dimension ref="A1"' in zipfile.ZipFile(io.BytesIO(file_bytes)).read('xl/worksheets/sheet1.xml')
+    df = load_excel_frame(file_bytes, engine='openpyxl')
+    pd.testing.assert_frame_equal(df, pd.DataFrame({'Country': ['PL', 'DE'], 'Name': ['Spring', 'Summer'],
+                                                    'Demand': [10, 20]}), check_dtype=False)
+
+
+def sheet_zip(sheet_xml):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as zf:
+        zf.writestr('sheet.xml', sheet_xml)
+    return zipfile.ZipFile(io.BytesIO(buf.getvalue()))
+
+
+SHEET_XML = (b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+             + b''.join(b'<row r="%d"><c r="A%d"><v>%d</v></c></row>' % (i, i, i) for i in range(1, 500))
+             + b'</sheetData><mergeCells count="2"><mergeCell ref="B2:C4"/><mergeCell ref="A1:A3"/></mergeCells>'
+             + b'<pageMargins left="0.7"/></worksheet>')
+
+
+@pytest.mark.parametrize('chunk_size', [1 << 20, 1000, 7])
+def test_merged_ranges_are_found_across_chunk_boundaries(chunk_size):
+    assert read_merged_ranges(sheet_zip(SHEET_XML), 'sheet.xml', chunk_size) == [(1, 3, 1, 1), (2, 4, 2, 3)]
+
+
+def test_merged_ranges_with_a_namespace_prefix_or_none_at_all():
+    prefixed = (b'<x:worksheet xmlns:x="urn:x"><x:sheetData/><x:mergeCells count="1">'
+                b'<x:mergeCell ref="D5:E5"/></x:mergeCells></x:worksheet>')
+    assert read_merged_ranges(sheet_zip(prefixed), 'sheet.xml') == [(5, 5, 4, 5)]
+    assert read_merged_ranges(sheet_zip(b'<worksheet><sheetData/></worksheet>'), 'sheet.xml') == []
+
+
+def test_merged_ranges_match_openpyxl():
+    wb = campaign_workbook()
+    wb.active.merge_cells('A2:A3')
+    wb.active.merge_cells('B1:C1')
+    with zipfile.ZipFile(io.BytesIO(xlsx_bytes(wb))) as zf:
+        ranges = read_merged_ranges(zf, 'xl/worksheets/sheet1.xml')
+    expected = sorted((r.min_row, r.max_row, r.min_col, r.max_col) for r in wb.active.merged_cells.ranges)
+    assert ranges == expected
+
+
+def test_fill_merged_ranges_copies_the_top_left_value():
+    grid = np.array([['a', None, None], [None, None, 'x'], [None, None, None]], dtype=object)
+    filled = fill_merged_ranges(grid, [(1, 2, 1, 2), (2, 3, 3, 3)])
+    assert filled.tolist() == [['a', 'a', None], ['a', 'a', 'x'], [None, None, 'x']]
+
+
+def test_fill_merged_ranges_clips_ranges_past_the_grid():
+    grid = np.array([['a', 'b'], [None, None]], dtype=object)
+    filled = fill_merged_ranges(grid, [(2, 5, 2, 4), (4, 6, 1, 1)])
+    assert filled.tolist() == [['a', 'b'], [None, None]]
+
+
+def test_merged_blocks_and_gaps_are_filled_on_load():
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['Country', 'Name', 'Demand'])
+    ws.append(['PL', 'Spring', 10])
+    ws.append([None, 'Summer', 20])
+    ws.append(['DE', 'Autumn', None])
+    ws.merge_cells('A2:A3')
+    df = load_excel_frame(xlsx_bytes(wb), engine='openpyxl')
+    assert df.to_dict('list') == {'Country': ['PL', 'PL', 'DE'], 'Name': ['Spring', 'Summer', 'Autumn'],
+                                  'Demand': [10, 20, 20]}
+
+
+def two_sheet_xlsx():
+    wb = Workbook()
+    wb.active.title = 'Notes'
+    wb.active.append(['readme'])
+    ws = wb.create_sheet('Data')
+    ws.append(['Country', 'Name', 'Demand', 'Start'])
+    ws.append(['PL', 'Spring', 10, datetime(2024, 3, 1)])
+    ws.append([None, 'Summer', 20.5, datetime(2024, 6, 1)])
+    ws.append(['DE', 'Autumn', 30, datetime(2024, 9, 1)])
+    ws.merge_cells('A2:A3')
+    wb.active = 1
+    return xlsx_bytes(wb)
+
+
+def two_sheet_xls(active):
+    xlwt = pytest.importorskip('xlwt')
+    wb = xlwt.Workbook()
+    date_style = xlwt.easyxf(num_format_str='DD.MM.YYYY')
+    for name in ('Notes', 'Data', 'More'):
+        wb.add_sheet(name)
+    wb.get_sheet(0).write(0, 0, 'readme')
+    wb.get_sheet(2).write(0, 0, 'readme')
+    ws = wb.get_sheet(1)
+    for col, header in enumerate(['Country', 'Name', 'Demand', 'Start']):
+        ws.write(0, col, header)
+    ws.write_merge(1, 2, 0, 0, 'PL')
+    for row, (name, demand, start) in enumerate([('Spring', 10, datetime(2024, 3, 1)),
+                                                 ('Summer', 20.5, datetime(2024, 6, 1)),
+                                                 ('Autumn', 30, datetime(2024, 9, 1))], start=1):
+        ws.write(row, 1, name)
+        ws.write(row, 2, demand)
+        ws.write(row, 3, start, date_style)
+    ws.write(3, 0, 'DE')
+    wb.active_sheet = active
+    for i in range(3):
+        wb.get_sheet(i).selected = wb.get_sheet(i).sheet_visible = i == active
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def test_xlsx_sheet_parts_reads_the_active_tab():
+    with zipfile.ZipFile(io.BytesIO(two_sheet_xlsx())) as zf:
+        active, sheets = xlsx_sheet_parts(zf)
+    assert active == 1
+    assert sheets == [('Notes', 'xl/worksheets/sheet1.xml'), ('Data', 'xl/worksheets/sheet2.xml')]
+
+
+def test_xlsx_sheet_parts_falls_back_to_the_first_sheet():
+    missing = rewrite_part(two_sheet_xlsx(), 'xl/workbook.xml', lambda xml: re.sub(rb'activeTab="\d+"', b'', xml))
+    out_of_range = rewrite_part(two_sheet_xlsx(), 'xl/workbook.xml',
+                                lambda xml: re.sub(rb'activeTab="\d+"', b'activeTab="7"', xml))
+    for file_bytes in (missing, out_of_range):
+        with zipfile.ZipFile(io.BytesIO(file_bytes)) as zf:
+            assert xlsx_sheet_parts(zf)[0] == 0
+
+
+@pytest.mark.parametrize('active', [0, 1, 2])
+def test_xls_active_sheet_reads_window1(active):
+    assert xls_active_sheet(two_sheet_xls(active)) == active
+
+
+@pytest.mark.parametrize('file_format', ['xlsx', 'xls'])
+def test_engines_agree_on_the_active_sheet(file_format):
+    file_bytes = two_sheet_xlsx() if file_format == 'xlsx' else two_sheet_xls(1)
+    engines = available_engines(file_format)
+    expected = pd.DataFrame({
+        'Country': ['PL', 'PL', 'DE'],
+        'Name': ['Spring', 'Summer', 'Autumn'],
+        'Demand': [10, 20.5, 30],
+        'Start': [datetime(2024, 3, 1), datetime(2024, 6, 1), datetime(2024, 9, 1)],
+    })
+    for engine in engines:
+        df = load_excel_frame(file_bytes, engine=engine)
+        assert df.attrs['excel_engine'] == engine
+        pd.testing.assert_frame_equal(df.astype(object), expected.astype(object), check_dtype=False, obj=engine)
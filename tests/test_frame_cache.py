@@ -0,0 +1,95 @@
+import pandas as pd
+
+from frame_cache import FrameCache, frame_nbytes
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def frame(n_rows=10):
+    return pd.DataFrame({'Demand': [float(i) for i in range(n_rows)]})
+
+
+def test_get_counts_hits_and_misses():
+    cache = FrameCache()
+    assert cache.get('a') is None
+    cache.put('a', frame())
+    pd.testing.assert_frame_equal(cache.get('a'), frame())
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_get_returns_a_shallow_copy():
+    cache = FrameCache()
+    cache.put('a', frame())
+    copy = cache.get('a')
+    copy['Extra'] = 1
+    assert list(cache.get('a').columns) == ['Demand']
+
+
+def test_evicts_least_recently_used_entry():
+    cache = FrameCache(max_entries=2)
+    cache.put('a', frame())
+    cache.put('b', frame())
+    cache.get('a')
+    cache.put('c', frame())
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_evicts_to_stay_under_max_bytes():
+    size = frame_nbytes(frame(100))
+    cache = FrameCache(max_bytes=2 * size)
+    for key in 'abc':
+        cache.put(key, frame(100))
+    assert cache.stats()['entries'] == 2 and cache.stats()['bytes'] == 2 * size
+    assert cache.get('a') is None
+
+
+def test_frame_larger_than_max_bytes_is_not_cached():
+    cache = FrameCache(max_bytes=frame_nbytes(frame(10)))
+    cache.put('big', frame(1000))
+    assert cache.get('big') is None and cache.stats()['bytes'] == 0
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = FrameCache(ttl=60, clock=clock)
+    cache.put('a', frame())
+    clock.now = 59
+    assert cache.get('a') is not None
+    clock.now = 61
+    assert cache.get('a') is None
+    assert cache.stats()['evictions'] == 1 and cache.stats()['entries'] == 0
+
+
+def test_put_drops_expired_entries():
+    clock = FakeClock()
+    cache = FrameCache(ttl=60, clock=clock)
+    cache.put('a', frame())
+    clock.now = 100
+    cache.put('b', frame())
+    assert cache.stats()['entries'] == 1 and cache.stats()['bytes'] == frame_nbytes(frame())
+
+
+def test_replacing_a_key_keeps_the_byte_count_right():
+    cache = FrameCache()
+    cache.put('a', frame(10))
+    cache.put('a', frame(100))
+    assert cache.stats()['entries'] == 1 and cache.stats()['bytes'] == frame_nbytes(frame(100))
+
+
+def test_other_values_share_the_byte_budget():
+    size = frame_nbytes(frame(100))
+    cache = FrameCache(max_bytes=2 * size)
+    index = object()
+    cache.put('index', index, nbytes=size)
+    cache.put('a', frame(100))
+    assert cache.get('index') is index
+    cache.put('b', frame(100))
+    assert cache.get('a') is None and cache.stats()['bytes'] == 2 * size
@@ -0,0 +1,50 @@
+import os
+
+import pandas as pd
+
+import upload_cache
+
+
+def test_content_key_depends_on_bytes_and_salt():
+    key = upload_cache.content_key(b'Country;Demand\nPL;1\n')
+    assert key == upload_cache.content_key(b'Country;Demand\nPL;1\n')
+    assert key != upload_cache.content_key(b'Country;Demand\nPL;2\n')
+    assert key != upload_cache.content_key(b'Country;Demand\nPL;1\n', salt='csv:6')
+
+
+def test_store_and_load_round_trip(tmp_path):
+    df = pd.DataFrame({'Country': ['PL', 'DE'], 'Demand': [1.5, None]})
+    assert upload_cache.store('abc', df, cache_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(upload_cache.load('abc', cache_dir=str(tmp_path)), df, check_dtype=False)
+
+
+def test_load_missing_or_corrupt_entry_returns_none(tmp_path):
+    assert upload_cache.load('missing', cache_dir=str(tmp_path)) is None
+    (tmp_path / 'broken.parquet').write_bytes(b'not parquet')
+    assert upload_cache.load('broken', cache_dir=str(tmp_path)) is None
+
+
+def test_store_writes_mixed_object_columns_as_text(tmp_path):
+    df = pd.DataFrame({'Mixed': [1, 'a', None, 2.5], 'Name': ['x', 'y', None, 'z']}, dtype=object)
+    assert upload_cache.store('mixed', df, cache_dir=str(tmp_path))
+    loaded = upload_cache.load('mixed', cache_dir=str(tmp_path))
+    assert loaded['Mixed'].isna().tolist() == [False, False, True, False]
+    assert loaded['Mixed'].dropna().tolist() == ['1', 'a', '2.5']
+    assert loaded['Name'].dropna().tolist() == ['x', 'y', 'z']
+    assert df['Mixed'].tolist()[:2] == [1, 'a']
+
+
+def test_store_skips_frames_pyarrow_cannot_write(tmp_path):
+    df = pd.DataFrame({'Opaque': [object(), object()]})
+    assert not upload_cache.store('mixed', df, cache_dir=str(tmp_path))
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+def test_evict_removes_least_recently_used_first(tmp_path):
+    df = pd.DataFrame({'Demand': range(1000)})
+    for i, key in enumerate(['old', 'mid', 'new']):
+        upload_cache.store(key, df, cache_dir=str(tmp_path))
+        os.utime(tmp_path / f'{key}.parquet', (1000 + i, 1000 + i))
+    size = os.path.getsize(tmp_path / 'new.parquet')
+    upload_cache.evict(cache_dir=str(tmp_path), max_bytes=2 * size)
+    assert sorted(os.listdir(tmp_path)) == ['mid.parquet', 'new.parquet']
@@ -0,0 +1,86 @@
+import hashlib
+import os
+import tempfile
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+CACHE_DIR = os.environ.get('CAMPAIGN_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'campaign_estimation_cache'))
+CACHE_MAX_BYTES = int(os.environ.get('CAMPAIGN_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+
+
+def content_key(file_bytes, salt=''):
+    # xxh3 runs at memory speed; blake2b is the stdlib fallback
+    h = xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+    h.update(salt.encode('utf-8'))
+    h.update(file_bytes)
+    return h.hexdigest()
+
+
+def _path(key, cache_dir):
+    return os.path.join(cache_dir, f"{key}.parquet")
+
+
+def load(key, cache_dir=CACHE_DIR):
+    path = _path(key, cache_dir)
+    try:
+        table = pq.read_table(path, memory_map=True)
+    except (FileNotFoundError, OSError, pa.ArrowException):
+        return None
+    # bump mtime so eviction treats the file as recently used
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return table.to_pandas()
+
+
+def _stringify_mixed(df):
+    # pyarrow needs one type per column; object columns mixing types are stored as text, NaN kept
+    mixed = [col for col in df.columns
+             if df[col].dtype == object and df[col].dropna().map(type).nunique() > 1]
+    if not mixed:
+        return df
+    df = df.copy(deep=False)
+    for col in mixed:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def store(key, df, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """Write df to the disk cache; frames pyarrow cannot serialise are skipped."""
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    os.close(fd)
+    try:
+        _stringify_mixed(df).to_parquet(tmp_path, engine='pyarrow', index=False)
+        os.replace(tmp_path, _path(key, cache_dir))
+    except (pa.ArrowException, ValueError, TypeError, OSError):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    evict(cache_dir, max_bytes)
+    return True
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith('.parquet'):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size